@@ -31,15 +31,14 @@ df, views = load_data_from_snowflake()
 st.success("Snowflake data loaded.")
 st.caption(
     f"{len(df):,} rows returned from Snowflake; "
-    f"{len(views['allWOs']):,} PROSERV WOs in scope."
+    f"{views.rows_in_scope:,} PROSERV WOs in scope."
 )
 
 # Unpack views
-allWOs = views["allWOs"]
-allTWWOs = views["allTWWOs"]
-total_backlog = views["total_backlog"]
-total_TW_backlog = views["total_TW_backlog"]
-tw_shift_map = views["tw_shift_map"]
+total_backlog = views.total_backlog
+total_TW_backlog = views.total_TW_backlog
+total_NANC_backlog = views.total_NANC_backlog
+tw_shift_map = views.tw_shift_map
 
 # -------------------------------------------------
 # 2. Sidebar – model parameters
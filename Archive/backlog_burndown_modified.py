@@ -461,6 +461,10 @@ def build_backlog_views(df: pd.DataFrame):
 # 3. BURNDOWN MODEL
 # ------------------------------------------------------------------
 
+# Working hours per FTE per month
+MONTHLY_HOURS = 2080 / 12
+
+
 def run_tailwind_model(
     total_backlog: float,
     total_TW_backlog: float,
@@ -489,8 +493,8 @@ def run_tailwind_model(
     TW_backlog = float(total_TW_backlog)
     Q2_backlog = float(total_backlog - total_TW_backlog)
 
-    TW_capacity = tw_headcount * (2080/12) * utilization
-    Q2_capacity = q2_headcount * (2080/12) * utilization
+    TW_capacity = tw_headcount * MONTHLY_HOURS * utilization
+    Q2_capacity = q2_headcount * MONTHLY_HOURS * utilization
     total_capacity = TW_capacity + Q2_capacity
 
     TW_incoming = qtr_demand_total * tw_share_of_demand * (1/3)
@@ -500,10 +504,24 @@ def run_tailwind_model(
     Q2_b = Q2_backlog
 
     tailwind_active = True
-    results_reduced = []
+
+    # Typed per-month outputs, filled by index
+    n = months
+    tw_out = np.empty(n)
+    q2_out = np.empty(n)
+    tot_out = np.empty(n)
+    cap_out = np.empty(n)
+    bm_out = np.full(n, np.nan)  # NaN where capacity is 0
+    active_out = np.empty(n, dtype=bool)
 
     threshold_hours = removal_threshold_months * total_capacity  # 4-month (or config) threshold
 
+    # Dense per-month shift hours (index = 0-based month_idx) instead of a dict lookup per month
+    shift_arr = np.zeros(n, dtype=np.float64)
+    for m, v in tw_shift_map.items():
+        if 0 <= m < n:
+            shift_arr[m] = v
+
     for month in range(1, months + 1):
         month_idx = month - 1
 
@@ -541,7 +559,7 @@ def run_tailwind_model(
 
         # Apply Q2 -> Tailwind eligibility shift for this month (only while Tailwind is active)
         if tailwind_active:
-            shift = tw_shift_map.get(month_idx, 0.0)
+            shift = shift_arr[month_idx]
             if shift > 0:
                 actual_shift = min(Q2_b, shift)
                 Q2_b -= actual_shift
@@ -565,15 +583,21 @@ def run_tailwind_model(
             total_cap_current = Q2_capacity
             backlog_months = total_b / total_cap_current if total_cap_current > 0 else None
 
-        results_reduced.append({
-            "Month": month,
-            "TW_Backlog": TW_b,
-            "Q2_Backlog": Q2_b,
-            "Total_Backlog": total_b,
-            "Total_Capacity": total_cap_current,
-            "Backlog_Months": backlog_months,
-            "Tailwind_Active": tailwind_active
-        })
-
-    df_reduced = pd.DataFrame(results_reduced)
+        tw_out[month_idx] = TW_b
+        q2_out[month_idx] = Q2_b
+        tot_out[month_idx] = total_b
+        cap_out[month_idx] = total_cap_current
+        if backlog_months is not None:
+            bm_out[month_idx] = backlog_months
+        active_out[month_idx] = tailwind_active
+
+    df_reduced = pd.DataFrame({
+        "Month": np.arange(1, n + 1),
+        "TW_Backlog": tw_out,
+        "Q2_Backlog": q2_out,
+        "Total_Backlog": tot_out,
+        "Total_Capacity": cap_out,
+        "Backlog_Months": bm_out,
+        "Tailwind_Active": active_out,
+    })
     return df_reduced
@@ -1,15 +1,63 @@
 # backlog_burndown.py
 
+import hashlib
+import threading
+from datetime import date
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import snowflake.connector
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
 # ------------------------------------------------------------------
 # 1. SNOWFLAKE QUERY + DATA LOAD
 # ------------------------------------------------------------------
 
-BURNDOWN_SQL = """
-WITH
+# Bind values for the BURNDOWN_SQL WHERE clause (pyformat; tuples expand to IN lists)
+BURNDOWN_PARAMS = {
+    "project_sub_type": "PROSERV",
+    "delivery_teams": ("CD - Wedge", "CD - Product SDK"),
+    "closed_statuses": ("Cancelled", "Completed", "Customer Requested Cancellation", "In Question"),
+}
+
+
+# Clustering for WORK_ORDER_C (run once by the table owner, not by the app).
+# Check the effect with BURNDOWN_CLUSTERING_CHECK_SQL.
+BURNDOWN_CLUSTERING_DDL = (
+    "ALTER TABLE Q2_ODS.SALESFORCE.WORK_ORDER_C CLUSTER BY (DELIVERY_TEAM_C, STATUS_C)",
+)
+BURNDOWN_CLUSTERING_CHECK_SQL = (
+    "SELECT SYSTEM$CLUSTERING_INFORMATION('Q2_ODS.SALESFORCE.WORK_ORDER_C', "
+    "'(DELIVERY_TEAM_C, STATUS_C)')"
+)
+
+
+# ------------------------------------------------------------------
+# Dynamic tables behind the expensive BURNDOWN_SQL aggregations.
+# Snowflake keeps them current (TARGET_LAG below), so a burndown run joins
+# pre-aggregated rows keyed on wo_id instead of recomputing them. Materialized
+# views can't express these (joins, window functions, LISTAGG), hence dynamic
+# tables; their refresh schedule replaces a separate task. _get_conn() runs
+# create_burndown_dynamic_tables() on connect, so any that are missing get built.
+# ------------------------------------------------------------------
+
+BURNDOWN_DT_SCHEMA = "Q2_ODS.BURNDOWN"
+BURNDOWN_DT_TARGET_LAG = "1 hour"
+BURNDOWN_DT_WAREHOUSE = "Q2_WH_BI"
+
+# Workspace -> WO mapping shared by both tables
+_WS_TO_WO_CTES = """
 /* ---------- Mavenlink workspaces ---------- */
 ml_workspace AS (
   SELECT
@@ -44,6 +92,12 @@ ws_to_wo AS (
   WHERE rn = 1
 ),
 
+"""
+
+# name -> (cluster key, SELECT)
+BURNDOWN_DYNAMIC_TABLES = {
+    # One row per WO x Mavenlink user (highest cardinality)
+    "ML_USER_HOURS": ("wo_id", "WITH" + _WS_TO_WO_CTES + """
 /* ---------- Mavenlink: aggregate once per workspace×user (COALESCE user_id -> -1) ---------- */
 time_by_ws_user AS (
   SELECT
@@ -85,28 +139,19 @@ ml_user_hours AS (
     ON a.workspace_id = u.workspace_id AND a.user_id_num = u.user_id_num
   LEFT JOIN time_by_ws_user t
     ON t.workspace_id = u.workspace_id AND t.user_id_num = u.user_id_num
-),
-
-/* ---------- Latest Role per workspace×user ---------- */
-wr_latest AS (
-  SELECT
-      wr.WORKSPACE_ID::STRING AS workspace_id,
-      wr.USER_ID              AS user_id_num,
-      COALESCE(wr.ROLE_NAME,'Unassigned') AS role_name
-  FROM Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE wr
-  QUALIFY ROW_NUMBER() OVER (
-    PARTITION BY wr.WORKSPACE_ID, wr.USER_ID
-    ORDER BY wr.UPDATED_AT DESC, wr.ID DESC
-  ) = 1
-),
+)
 
+SELECT * FROM ml_user_hours
+"""),
+    # One row per WO: WOLI lists, products, project sub-type
+    "BACKLOG_BASE": ("wo_id", "WITH" + _WS_TO_WO_CTES + """
 /* ---------- WOLI lists per WO (IDs, Names, Count) ---------- */
 woli_lists_by_wo AS (
   SELECT
     woli.WORK_ORDER_C::STRING AS wo_id,
     COUNT(DISTINCT woli.ID)   AS woli_count,
-    LISTAGG(DISTINCT woli.ID::STRING, ', ')   AS woli_ids,
-    LISTAGG(DISTINCT woli.NAME, ', ')         AS woli_names
+    ARRAY_AGG(DISTINCT woli.ID::STRING)      AS woli_ids,
+    ARRAY_AGG(DISTINCT woli.NAME)            AS woli_names
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_LINE_ITEM_C woli
   GROUP BY woli.WORK_ORDER_C
 ),
@@ -115,14 +160,96 @@ woli_lists_by_wo AS (
 products_by_wo AS (
   SELECT
     woli.WORK_ORDER_C::STRING AS wo_id,
-    LISTAGG(DISTINCT p2.NAME, ', ') WITHIN GROUP (ORDER BY p2.NAME) AS product_names
+    ARRAY_AGG(DISTINCT p2.NAME) WITHIN GROUP (ORDER BY p2.NAME) AS product_names
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_LINE_ITEM_C woli
   LEFT JOIN Q2_ODS.SALESFORCE.PRODUCT_2 p2 ON p2.ID = woli.PRODUCT_C
   GROUP BY woli.WORK_ORDER_C
 ),
 
-/* ---------- Salesforce WO header + Contingent WO linkage + Record Type ---------- */
-wo_base AS (
+workspace_attrs_by_wo AS (
+  SELECT
+    map.wo_id,
+    MAX(ms.custom_project_sub_type) AS project_sub_type
+  FROM ml_workspace ms
+  JOIN ws_to_wo map ON map.workspace_id = ms.workspace_id
+  GROUP BY map.wo_id
+)
+
+SELECT
+  k.wo_id,
+  wl.woli_count,
+  wl.woli_ids,
+  wl.woli_names,
+  pr.product_names,
+  wa.project_sub_type
+FROM (
+  SELECT wo_id FROM woli_lists_by_wo
+  UNION
+  SELECT wo_id FROM workspace_attrs_by_wo
+) k
+LEFT JOIN woli_lists_by_wo wl        ON wl.wo_id = k.wo_id
+LEFT JOIN products_by_wo pr          ON pr.wo_id = k.wo_id
+LEFT JOIN workspace_attrs_by_wo wa   ON wa.wo_id = k.wo_id
+"""),
+}
+
+
+def create_burndown_dynamic_tables(cur):
+    """Create (if missing) the dynamic tables BURNDOWN_SQL reads from."""
+    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {BURNDOWN_DT_SCHEMA}")
+    for name, (cluster_key, select_sql) in BURNDOWN_DYNAMIC_TABLES.items():
+        cur.execute(
+            f"CREATE DYNAMIC TABLE IF NOT EXISTS {BURNDOWN_DT_SCHEMA}.{name} "
+            f"TARGET_LAG = '{BURNDOWN_DT_TARGET_LAG}' "
+            f"WAREHOUSE = {BURNDOWN_DT_WAREHOUSE} "
+            f"CLUSTER BY ({cluster_key}) "
+            f"AS {select_sql}"
+        )
+
+
+# Opportunity record type id -> name. The table is the source of truth;
+# this dict only seeds ids it doesn't have yet.
+RECORD_TYPE_TABLE = "Q2_ODS.REFERENCE.OPPORTUNITY_RECORD_TYPE"
+OPPORTUNITY_RECORD_TYPES = {
+    "0120h000000kwUeAAI": "Q2 Gro Cross Sales Opportunity",
+    "0121A000000GVD3QAO": "Helix Cross Sale Opportunity",
+    "0121A000000MazmQAC": "Helix Net New Opportunity",
+    "0121A000000UlN6QAK": "Centrix Cross Sales Opportunity Record Type",
+    "0124X000000AZVYQA4": "Q2 Off-Platform Sales Opportunity Cross Sales",
+    "0124X000001yTi5QAE": "Channel Partner Opportunity",
+    "0124X000001ZWN2QAO": "PL Cross Sales Opportunity",
+    "012800000003bw0AAA": "Q2 Net New Sales Opportunity",
+    "012800000003Z3RAAU": "Q2 Cross Sales Opportunity Record Type",
+    "012C0000000Q4NyIAK": "Renewal/Extension Opportunity Record Type",
+    "012C0000000Q9x0IAC": "Amendment",
+    "012C0000000QFAxIAO": "Termination Record Type",
+}
+
+
+def create_record_type_table(cur):
+    """Create (if missing) RECORD_TYPE_TABLE and insert any unseeded record types."""
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {RECORD_TYPE_TABLE} "
+        "(id STRING PRIMARY KEY RELY, name STRING NOT NULL)"
+    )
+    values = ", ".join(["(%s, %s)"] * len(OPPORTUNITY_RECORD_TYPES))
+    cur.execute(
+        f"MERGE INTO {RECORD_TYPE_TABLE} t "
+        f"USING (SELECT column1 AS id, column2 AS name FROM VALUES {values}) s "
+        "ON t.id = s.id "
+        "WHEN NOT MATCHED THEN INSERT (id, name) VALUES (s.id, s.name)",
+        [v for pair in OPPORTUNITY_RECORD_TYPES.items() for v in pair],
+    )
+
+
+# Salesforce WO header + Contingent WO linkage + Record Type, materialized once
+# per session: WORK_ORDER_C is scanned (and self-joined for the contingent WO)
+# here instead of wherever the planner re-inlines a wo_base CTE. Ordered by
+# wo_id so the temp table's micro-partitions are naturally clustered on the
+# join key. Must run on the same connection before BURNDOWN_SQL, after
+# create_record_type_table() (done by _get_conn()).
+WO_BASE_TEMP_SQL = """
+CREATE OR REPLACE TEMPORARY TABLE wo_base_tmp AS
   SELECT
     wo.ID::STRING             AS wo_id,
     wo.NAME                   AS wo_code,
@@ -183,29 +310,40 @@ wo_base AS (
            )
     END AS contingent_wo_go_live_date,
 
-    /* Record Type Id forced to text + inline mapping to name */
+    /* Record Type Id forced to text + name from the reference table */
     o.RECORD_TYPE_ID::STRING              AS opportunity_record_type_id,
-    CASE o.RECORD_TYPE_ID
-      WHEN '0120h000000kwUeAAI' THEN 'Q2 Gro Cross Sales Opportunity'
-      WHEN '0121A000000GVD3QAO' THEN 'Helix Cross Sale Opportunity'
-      WHEN '0121A000000MazmQAC' THEN 'Helix Net New Opportunity'
-      WHEN '0121A000000UlN6QAK' THEN 'Centrix Cross Sales Opportunity Record Type'
-      WHEN '0124X000000AZVYQA4' THEN 'Q2 Off-Platform Sales Opportunity Cross Sales'
-      WHEN '0124X000001yTi5QAE' THEN 'Channel Partner Opportunity'
-      WHEN '0124X000001ZWN2QAO' THEN 'PL Cross Sales Opportunity'
-      WHEN '012800000003bw0AAA' THEN 'Q2 Net New Sales Opportunity'
-      WHEN '012800000003Z3RAAU' THEN 'Q2 Cross Sales Opportunity Record Type'
-      WHEN '012C0000000Q4NyIAK' THEN 'Renewal/Extension Opportunity Record Type'
-      WHEN '012C0000000Q9x0IAC' THEN 'Amendment'
-      WHEN '012C0000000QFAxIAO' THEN 'Termination Record Type'
-      ELSE 'Unknown Record Type'
-    END AS opportunity_record_type_name
+    COALESCE(rt.name, 'Unknown Record Type') AS opportunity_record_type_name
 
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_C wo
   LEFT JOIN Q2_ODS.SALESFORCE.OPPORTUNITY o
     ON o.ID = wo.OPPORTUNITY_C
+  LEFT JOIN {rt} rt
+    ON rt.id = o.RECORD_TYPE_ID
   LEFT JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C pwo
     ON pwo.NAME = wo.PLATFORM_WO_FOR_RFA_C
+  /* Filter on the clustering keys here so WORK_ORDER_C partitions are pruned */
+  WHERE wo.DELIVERY_TEAM_C IN %(delivery_teams)s
+    AND (wo.STATUS_C IS NULL OR wo.STATUS_C NOT IN %(closed_statuses)s)
+  ORDER BY wo_id
+""".format(rt=RECORD_TYPE_TABLE)
+
+
+BURNDOWN_SQL = """
+WITH
+/* ---------- Pre-aggregated (dynamic tables) ---------- */
+ml_user_hours AS (SELECT * FROM {dt}.ML_USER_HOURS),
+
+/* ---------- Latest Role per workspace×user ---------- */
+wr_latest AS (
+  SELECT
+      wr.WORKSPACE_ID::STRING AS workspace_id,
+      wr.USER_ID              AS user_id_num,
+      COALESCE(wr.ROLE_NAME,'Unassigned') AS role_name
+  FROM Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE wr
+  QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY wr.WORKSPACE_ID, wr.USER_ID
+    ORDER BY wr.UPDATED_AT DESC, wr.ID DESC
+  ) = 1
 ),
 
 sf_account AS (
@@ -218,14 +356,6 @@ sf_user AS (
   SELECT u.ID::STRING AS user_id,
          u.NAME       AS user_name
   FROM Q2_ODS.SALESFORCE.USER u
-),
-workspace_attrs_by_wo AS (
-  SELECT
-    map.wo_id,
-    MAX(ms.custom_project_sub_type) AS project_sub_type
-  FROM ml_workspace ms
-  JOIN ws_to_wo map ON map.workspace_id = ms.workspace_id
-  GROUP BY map.wo_id
 )
 
 SELECT
@@ -240,7 +370,7 @@ SELECT
   wb.project_status_sf                       AS "Project Status",
   wb.slotted_start_date                      AS "Slotted Start Date",
   wb.slotted_go_live_date                    AS "Slotted Go-Live Date",
-  wa.project_sub_type                        AS "Project Sub-Type",
+  bb.project_sub_type                        AS "Project Sub-Type",
   wb.contingent_wo_code                      AS "Contingent Work Order",
   wb.contingent_wo_go_live_date              AS "Contingent Go-Live Date",
   wb.analysis_outlier_reason                 AS "Analysis Outlier Reason",
@@ -257,11 +387,11 @@ SELECT
   bc_user.user_name                          AS "BC (SF)",
   cs_user.user_name                          AS "Configuration Specialist (SF)",
 
-  /* Products & WOLIs */
-  pr.product_names                           AS "Product Name(s)",
-  wl.woli_ids                                AS "Work Order Line Item Ids",
-  wl.woli_names                              AS "Work Order Line Item Names",
-  wl.woli_count                              AS "WOLI Count",
+  /* Products & WOLIs (ARRAY columns arrive as JSON array text) */
+  bb.product_names                           AS "Product Name(s)",
+  bb.woli_ids                                AS "Work Order Line Item Ids",
+  bb.woli_names                              AS "Work Order Line Item Names",
+  bb.woli_count                              AS "WOLI Count",
 
   /* Forecasts (normalized) */
   wb.pm_hours_forecast                       AS "PM Hours Forecast",
@@ -289,12 +419,10 @@ SELECT
   COALESCE(ml.allocated_hours, 0)          AS "Allocated Hours (User×CWO)",
   COALESCE(ml.hours_logged,   0)           AS "Hours Logged (User×CWO)"
 
-FROM wo_base wb
+FROM wo_base_tmp wb
 LEFT JOIN ml_user_hours ml           ON ml.wo_id       = wb.wo_id
 LEFT JOIN sf_account acc             ON acc.account_id = wb.account_id
-LEFT JOIN workspace_attrs_by_wo wa   ON wa.wo_id       = wb.wo_id
-LEFT JOIN products_by_wo pr          ON pr.wo_id       = wb.wo_id
-LEFT JOIN woli_lists_by_wo wl        ON wl.wo_id       = wb.wo_id
+LEFT JOIN {dt}.BACKLOG_BASE bb        ON bb.wo_id       = wb.wo_id
 
 /* People lookups (SF) */
 LEFT JOIN sf_user pm                 ON pm.user_id      = wb.pm_user_id
@@ -306,87 +434,196 @@ LEFT JOIN wr_latest wr               ON wr.workspace_id = ml.workspace_id
                                      AND wr.user_id_num = ml.user_id_num
 LEFT JOIN Q2_ODS.MAVENLINK.USER mu   ON mu.ID           = ml.user_id_num
 
+/* Only rows build_backlog_views() can use (allWOs ⊇ allTWWOs, allNANCWOs) */
+WHERE bb.project_sub_type = %(project_sub_type)s
+  AND wb.delivery_team IN %(delivery_teams)s
+  AND (wb.project_status_sf IS NULL OR wb.project_status_sf NOT IN %(closed_statuses)s)
+
 ORDER BY "Account Name", "Work Order Code", "Mavenlink User Name"
-"""
+""".format(dt=BURNDOWN_DT_SCHEMA)
 
 
-def fetch_backlog_df():
-    """Pulls the raw dataframe from Snowflake using your SQL."""
-    conn = snowflake.connector.connect(
-        account="Q2-Q2EDW",
-        user="THEBNER",
-        role="DW_IMPL_USRS",
-        warehouse="Q2_WH_BI",
-        database="Q2_ODS",
-        schema="MAVENLINK",
-        authenticator="externalbrowser",
-    )
-    cur = conn.cursor()
+# Only the columns build_backlog_views() reads: no people, product/WOLI,
+# record-type or Mavenlink role/user lookups.
+BURNDOWN_SQL_SLIM = """
+SELECT
+  wb.wo_code                                AS "Work Order Code",
+  acc.NAME                                   AS "Account Name",
+  wb.work_order_description                  AS "Work Order Description",
+  wb.project_status_sf                       AS "Project Status",
+  wb.slotted_go_live_date                    AS "Slotted Go-Live Date",
+  bb.project_sub_type                        AS "Project Sub-Type",
+  wb.contingent_wo_code                      AS "Contingent Work Order",
+  wb.contingent_wo_go_live_date              AS "Contingent Go-Live Date",
+  wb.delivery_team                           AS "Delivery Team",
+  COALESCE(ml.allocated_hours, 0)          AS "Allocated Hours (User×CWO)",
+  COALESCE(ml.hours_logged,   0)           AS "Hours Logged (User×CWO)"
+
+FROM wo_base_tmp wb
+LEFT JOIN {dt}.ML_USER_HOURS ml           ON ml.wo_id = wb.wo_id
+LEFT JOIN Q2_ODS.SALESFORCE.ACCOUNT acc   ON acc.ID   = wb.account_id
+LEFT JOIN {dt}.BACKLOG_BASE bb            ON bb.wo_id = wb.wo_id
+
+WHERE bb.project_sub_type = %(project_sub_type)s
+  AND wb.delivery_team IN %(delivery_teams)s
+  AND (wb.project_status_sf IS NULL OR wb.project_status_sf NOT IN %(closed_statuses)s)
+""".format(dt=BURNDOWN_DT_SCHEMA)
+
+# (Month, Shift_Hours) for NANC -> actionable shifts, computed in Snowflake.
+# Same rules as build_backlog_views' pandas path: per-WO backlog > 0 with a
+# contingent go-live, bucketed by days-to-go-live // 30 (floored at 0) + 1.
+# Reads wo_base_tmp, so it runs after WO_BASE_TEMP_SQL on the same session.
+SHIFT_SCHEDULE_SQL = """
+WITH nanc_wo AS (
+  SELECT
+      wb.wo_id,
+      wb.contingent_wo_go_live_date AS go_live,
+      SUM(COALESCE(ml.allocated_hours, 0) - COALESCE(ml.hours_logged, 0)) AS backlog
+  FROM wo_base_tmp wb
+  JOIN {dt}.BACKLOG_BASE bb            ON bb.wo_id = wb.wo_id
+  LEFT JOIN {dt}.ML_USER_HOURS ml      ON ml.wo_id = wb.wo_id
+  WHERE bb.project_sub_type = %(project_sub_type)s
+    AND wb.delivery_team = 'CD - Product SDK'
+    AND wb.project_status_sf = 'Pending GA'
+    AND wb.contingent_wo_go_live_date IS NOT NULL
+  GROUP BY wb.wo_id, wb.contingent_wo_go_live_date
+  HAVING backlog > 0
+)
+SELECT
+    GREATEST(FLOOR(DATEDIFF(day, CURRENT_DATE, go_live) / 30), 0) + 1 AS "Month",
+    SUM(backlog)::FLOAT AS "Shift_Hours"
+FROM nanc_wo
+GROUP BY 1
+ORDER BY 1
+""".format(dt=BURNDOWN_DT_SCHEMA)
+
+
+CATEGORY_COLUMNS = ("Delivery Team", "Project Status", "Project Sub-Type", "Role Name")
+
+CACHE_DIR = Path(".cache")
+
+
+def _cache_path(name: str, sql: str) -> Path:
+    """Parquet extract path keyed on the SQL + binds and today's date."""
+    key = hashlib.sha256((WO_BASE_TEMP_SQL + sql + repr(BURNDOWN_PARAMS)).encode()).hexdigest()[:16]
+    return CACHE_DIR / f"shiftfix_{name}_{key}_{date.today().isoformat()}.parquet"
+
+
+_conn = None
+
+
+def _get_conn():
+    """Module-wide Snowflake connection, so SSO runs once per process.
+
+    A fresh connection first creates any missing objects the queries read.
+    """
+    global _conn
+    if _conn is None or _conn.is_closed():
+        _conn = snowflake.connector.connect(
+            account="Q2-Q2EDW",
+            user="THEBNER",
+            role="DW_IMPL_USRS",
+            warehouse="Q2_WH_BI",
+            database="Q2_ODS",
+            schema="MAVENLINK",
+            authenticator="externalbrowser",
+            client_session_keep_alive=True,
+        )
+        cur = _conn.cursor()
+        try:
+            create_burndown_dynamic_tables(cur)  # no-op once they exist
+            create_record_type_table(cur)  # WO_BASE_TEMP_SQL joins it
+        finally:
+            cur.close()
+    return _conn
+
+
+# Every caller shares _conn, and with it the session's wo_base_tmp; without
+# this, one call's CREATE OR REPLACE could swap the table out from under
+# another call's SELECT.
+_wo_base_lock = threading.Lock()
+
+
+def _execute_on_wo_base(cur, sql: str):
+    """Rebuild wo_base_tmp and run `sql` against it, one caller at a time."""
+    with _wo_base_lock:
+        cur.execute(WO_BASE_TEMP_SQL, BURNDOWN_PARAMS)
+        cur.execute(sql, BURNDOWN_PARAMS)
+
+
+def _query_backlog_table(sql: str) -> pa.Table:
+    """Run `sql` (after the wo_base temp table) and return the typed Arrow result."""
+    cur = _get_conn().cursor()
     try:
-        cur.execute(BURNDOWN_SQL)
-        df = cur.fetch_pandas_all()
+        _execute_on_wo_base(cur, sql)
+        tbl = pa.concat_tables(cur.fetch_arrow_batches())
         print("✅ Projects from Snowflake successfully pulled.")
     finally:
         cur.close()
-        conn.close()
-    return df
 
+    # DATE arrives as date32 (object dates in pandas); cast to timestamp here
+    # so build_backlog_views' to_datetime is a no-op.
+    i = tbl.schema.get_field_index("Contingent Go-Live Date")
+    tbl = tbl.set_column(
+        i, "Contingent Go-Live Date", pc.cast(tbl.column(i), pa.timestamp("ns"))
+    )
+    # Low-cardinality labels: dictionary-encode so to_pandas yields categoricals
+    for col in CATEGORY_COLUMNS:
+        i = tbl.schema.get_field_index(col)
+        if i >= 0:
+            tbl = tbl.set_column(i, col, pc.dictionary_encode(tbl.column(i)))
+    return tbl
 
-# ------------------------------------------------------------------
-# 2. BUILD ALLWOs / ALLTWWOs / SHIFT MAP FROM DATAFRAME
-# ------------------------------------------------------------------
 
-def build_backlog_views(df: pd.DataFrame):
-    """From raw df, build allWOs/allTWWOs/NANC and tw_shift_map and totals."""
+def fetch_backlog_df(use_cache: bool = True, slim: bool = True):
+    """Pulls the raw dataframe from Snowflake, or today's Parquet copy of it.
 
-    # Query for totals
-    dtquery = '`Delivery Team` in ["CD - Wedge","CD - Product SDK"]'
-    statusquery = '`Project Status` not in ["Cancelled", "Completed", "Customer Requested Cancellation", "In Question"]'
-    subtypequery = '`Project Sub-Type` == "PROSERV"'
+    slim=True selects only what build_backlog_views() needs
+    (BURNDOWN_SQL_SLIM); slim=False pulls the full per-user detail.
+    """
+    name, sql = ("slim", BURNDOWN_SQL_SLIM) if slim else ("full", BURNDOWN_SQL)
+    path = _cache_path(name, sql)
+    if use_cache and path.exists():
+        print("✅ Using today's cached extract.")
+        tbl = pq.read_table(path)
+    else:
+        tbl = _query_backlog_table(sql)
+        CACHE_DIR.mkdir(exist_ok=True)
+        # Older days / SQL versions are never read again
+        for stale in CACHE_DIR.glob(f"shiftfix_{name}_*.parquet"):
+            stale.unlink()
+        pq.write_table(tbl, path, compression="zstd")
+
+    # Arrow result -> pandas directly (no per-batch pandas concat);
+    # self_destruct frees each Arrow column as it is converted.
+    df = tbl.to_pandas(split_blocks=True, self_destruct=True)
+    del tbl
+    return df
 
-    allWOs = (
-        df
-        .query(f"{dtquery} and {statusquery} and {subtypequery}")
-        .reset_index(drop=True)
-    )
-    allWOs = allWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
 
-    # Tailwind-only (CD - Wedge)
-    dtTWquery = '`Delivery Team` in ["CD - Wedge"]'
-    allTWWOs = (
-        df
-        .query(f"{dtTWquery} and {statusquery} and {subtypequery}")
-        .reset_index(drop=True)
-    )
-    allTWWOs = allTWWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
+def fetch_shift_schedule() -> pd.DataFrame:
+    """(Month, Shift_Hours) shift schedule computed in Snowflake; pass to build_backlog_views."""
+    cur = _get_conn().cursor()
+    try:
+        _execute_on_wo_base(cur, SHIFT_SCHEDULE_SQL)
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    return pd.DataFrame(rows, columns=["Month", "Shift_Hours"])
 
-    # Non-Actionable Non-Certified (optional)
-    NANC_dtquery = '`Delivery Team` in ["CD - Product SDK"]'
-    NANC_statusquery = '`Project Status` in ["Pending GA"]'
-    allNANCWOs = (
-        df
-        .query(f"{NANC_dtquery} and {NANC_statusquery} and {subtypequery}")
-        .reset_index(drop=True)
-    )
-    allNANCWOs = allNANCWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
 
-    # Total backlog
-    allocated_sum = allWOs["Allocated_Hours"].sum()
-    logged_sum = allWOs["Hours_Logged"].sum()
-    total_backlog = float(allocated_sum - logged_sum)
+# ------------------------------------------------------------------
+# 2. BUILD ALLWOs / ALLTWWOs / SHIFT MAP FROM DATAFRAME
+# ------------------------------------------------------------------
 
-    TW_allocated_sum = allTWWOs["Allocated_Hours"].sum()
-    TW_logged_sum = allTWWOs["Hours_Logged"].sum()
-    total_TW_backlog = float(TW_allocated_sum - TW_logged_sum)
+def _code_mask(col: pd.Series, values) -> np.ndarray:
+    """Rows of categorical `col` whose label is in `values`, compared on integer codes."""
+    codes = col.cat.categories.get_indexer(values)
+    return np.isin(col.cat.codes.to_numpy(), codes[codes >= 0])
+
+
+def _nanc_shift_schedule(allNANCWOs: pd.DataFrame):
+    """Per-WO eligible NANC backlog and its (Month, Shift_Hours) schedule."""
     # Build shift map (Non-Actionable Non-Certified -> Actionable (Tailwind/Actionable bucket))
     # We shift the *remaining* non-actionable backlog into an actionable bucket based on the
     # Contingent Go-Live Date (which already includes a 6-month fallback in the SQL).
@@ -395,20 +632,26 @@ def build_backlog_views(df: pd.DataFrame):
     # modeled month (Month 1), we shift by (Months_To_GoLive + 1). Month 0 is reserved for
     # "current state" output with no flow applied.
 
-    nanc_wo_backlog = (
+    # Hours are per user×WO and get summed; the header columns are per-WO
+    # constants, so the first row of each WO carries them.
+    sums = (
+        allNANCWOs
+        .groupby("Work Order Code", sort=False)[["Allocated_Hours", "Hours_Logged"]]
+        .sum()
+    )
+    firsts = (
         allNANCWOs
-        .groupby("Work Order Code", as_index=False)
-        .agg({
-            "Allocated_Hours": "sum",
-            "Hours_Logged": "sum",
-            "Delivery Team": "first",
-            "Account Name": "first",
-            "Work Order Description": "first",
-            "Contingent Work Order": "first",
-            "Contingent Go-Live Date": "first",
-            "Slotted Go-Live Date": "first",
-        })
+        .drop_duplicates("Work Order Code", keep="first")
+        .set_index("Work Order Code")[[
+            "Delivery Team",
+            "Account Name",
+            "Work Order Description",
+            "Contingent Work Order",
+            "Contingent Go-Live Date",
+            "Slotted Go-Live Date",
+        ]]
     )
+    nanc_wo_backlog = sums.join(firsts).reset_index()
 
     nanc_wo_backlog["Backlog"] = nanc_wo_backlog["Allocated_Hours"] - nanc_wo_backlog["Hours_Logged"]
     nanc_wo_backlog["Contingent Go-Live Date"] = pd.to_datetime(
@@ -422,30 +665,68 @@ def build_backlog_views(df: pd.DataFrame):
         & nanc_wo_backlog["Contingent Go-Live Date"].notna()
     ].copy()
 
-    nanc_eligible["Days_To_GoLive"] = (nanc_eligible["Contingent Go-Live Date"] - today).dt.days
-    nanc_eligible["Months_To_GoLive"] = (
-        (nanc_eligible["Days_To_GoLive"] // 30)
-        .clip(lower=)
-        .astype(int)
-    )
+    days = (
+        nanc_eligible["Contingent Go-Live Date"].to_numpy(dtype="datetime64[D]")
+        - np.datetime64(today.date(), "D")
+    ).astype(np.int64)
+    months_to_gl = np.maximum(days // 30, 0)
 
+    nanc_eligible["Days_To_GoLive"] = days
+    nanc_eligible["Months_To_GoLive"] = months_to_gl
     # Shift in month (Months_To_GoLive + 1) so 0-month items shift in Month 1
-    nanc_eligible["Shift_Month"] = nanc_eligible["Months_To_GoLive"] + 1
+    nanc_eligible["Shift_Month"] = months_to_gl + 1
 
-    shift_schedule = (
-        nanc_eligible
-        .groupby("Shift_Month", as_index=False)["Backlog"]
-        .sum()
-        .rename(columns={
-            "Shift_Month": "Month",
-            "Backlog": "Shift_Hours"
-        })
+    # Hours per shift month in one pass (Shift_Month >= 1, so index 0 stays empty)
+    shift_sums = np.bincount(
+        months_to_gl + 1,
+        weights=nanc_eligible["Backlog"].to_numpy(dtype=np.float64),
     )
+    shift_months = np.flatnonzero(shift_sums)
+    shift_schedule = pd.DataFrame({
+        "Month": shift_months,
+        "Shift_Hours": shift_sums[shift_months],
+    })
+    return nanc_eligible, shift_schedule
 
-    tw_shift_map = {
-        int(row["Month"]): float(row["Shift_Hours"])
-        for _, row in shift_schedule.iterrows()
-    }
+
+def build_backlog_views(df: pd.DataFrame, shift_schedule: pd.DataFrame | None = None):
+    """From raw df, build allWOs/allTWWOs/NANC and tw_shift_map and totals."""
+
+    # SQL already limits rows to PROSERV / Wedge + Product SDK / not closed,
+    # so allWOs is the whole frame and the subsets are plain masks.
+    # Rename once, then slice by position.
+    wide = df.rename(columns={
+        "Allocated Hours (User×CWO)": "Allocated_Hours",
+        "Hours Logged (User×CWO)": "Hours_Logged"
+    })
+    dt = wide["Delivery Team"]
+    tw = _code_mask(dt, ["CD - Wedge"])
+    nanc = _code_mask(dt, ["CD - Product SDK"]) & _code_mask(wide["Project Status"], ["Pending GA"])
+
+    allWOs = wide.reset_index(drop=True).reset_index()
+
+    # Tailwind-only (CD - Wedge)
+    allTWWOs = wide.iloc[np.flatnonzero(tw)].reset_index(drop=True).reset_index()
+
+    # Non-Actionable Non-Certified (optional)
+    allNANCWOs = wide.iloc[np.flatnonzero(nanc)].reset_index(drop=True).reset_index()
+
+    # Total backlog
+    allocated_sum = allWOs["Allocated_Hours"].sum()
+    logged_sum = allWOs["Hours_Logged"].sum()
+    total_backlog = float(allocated_sum - logged_sum)
+
+    TW_allocated_sum = allTWWOs["Allocated_Hours"].sum()
+    TW_logged_sum = allTWWOs["Hours_Logged"].sum()
+    total_TW_backlog = float(TW_allocated_sum - TW_logged_sum)
+
+    # Shift schedule from SQL if the caller fetched it (fetch_shift_schedule);
+    # the per-WO eligible detail is only built on the pandas path.
+    if shift_schedule is None:
+        nanc_eligible, shift_schedule = _nanc_shift_schedule(allNANCWOs)
+    else:
+        nanc_eligible = None
+    tw_shift_map = dict(zip(shift_schedule["Month"].tolist(), shift_schedule["Shift_Hours"].tolist()))
 
     return {
         "df": df,
@@ -463,6 +744,123 @@ def build_backlog_views(df: pd.DataFrame):
 # ------------------------------------------------------------------
 
 
+MONTHLY_HOURS = 2080 / 12
+
+
+def _shift_vec(tw_shift_map: dict, months: int) -> np.ndarray:
+    """Dense NANC -> actionable shift hours (index = 1-based month; index 0 unused)."""
+    shift_vec = np.zeros(months + 1, dtype=np.float64)
+    for m, v in tw_shift_map.items():
+        if 0 <= m <= months:
+            shift_vec[m] = v or 0.0
+    return shift_vec
+
+
+@njit(cache=True, nogil=True)
+def _burn_kernel(
+    months,
+    TW_b,
+    NANC_b,
+    ANC_b,
+    TW_capacity_base,
+    Q2_capacity_base,
+    qtr_demand_total,
+    tw_share_of_demand,
+    q2_capacity_to_q2_pct,
+    removal_threshold_months,
+    tw_capacity_reduction_month,
+    shift_vec,
+    model_diff_demand_after_removal,
+    post_removal_qtr_demand_total,
+    modify_demand_after_12_months,
+    post_12_qtr_demand_total,
+):
+    """Month loop of run_tailwind_model; None inputs resolved by the caller.
+
+    Returns a (months + 1, 8) array with columns Total, TW, NANC, ANC,
+    Actionable backlog, capacity, backlog months (NaN when capacity is 0)
+    and Tailwind-active (1.0 / 0.0).
+    """
+    out = np.empty((months + 1, 8), dtype=np.float64)
+    tailwind_active = True
+
+    for month in range(months + 1):
+        apply_flow = month > 0
+
+        # Capacities this month
+        if tailwind_active:
+            TW_cap_current = TW_capacity_base
+            if tw_capacity_reduction_month > 0 and month >= tw_capacity_reduction_month:
+                TW_cap_current *= 0.5
+        else:
+            TW_cap_current = 0.0
+        Q2_cap_current = Q2_capacity_base
+
+        # Incoming demand (actionable buckets only)
+        TW_incoming = 0.0
+        ANC_incoming = 0.0
+        if apply_flow:
+            active_qtr_demand = qtr_demand_total
+            if modify_demand_after_12_months and month >= 13:
+                active_qtr_demand = post_12_qtr_demand_total
+
+            if tailwind_active:
+                TW_incoming = active_qtr_demand * tw_share_of_demand * (1 / 3)
+                ANC_incoming = active_qtr_demand * (1 - tw_share_of_demand) * (1 / 3)
+            elif model_diff_demand_after_removal:
+                ANC_incoming = post_removal_qtr_demand_total * (1 / 3)
+            else:
+                ANC_incoming = active_qtr_demand * (1 / 3)
+
+            # Shift NANC -> actionable
+            shift = shift_vec[month]
+            if shift > 0:
+                actual_shift = min(NANC_b, shift)
+                NANC_b -= actual_shift
+                if tailwind_active:
+                    TW_b += actual_shift
+                else:
+                    ANC_b += actual_shift
+
+            # Burn (only actionable buckets)
+            if tailwind_active:
+                ANC_burn_cap = Q2_cap_current * q2_capacity_to_q2_pct
+                TW_burn_cap = TW_cap_current + (Q2_cap_current - ANC_burn_cap)
+            else:
+                TW_burn_cap = 0.0
+                ANC_burn_cap = Q2_cap_current
+
+            TW_burn = min(TW_b, TW_burn_cap)
+            ANC_burn = min(ANC_b, ANC_burn_cap)
+            TW_b = max(TW_b - TW_burn + TW_incoming, 0.0)
+            ANC_b = max(ANC_b - ANC_burn + ANC_incoming, 0.0)
+
+        actionable_backlog = TW_b + ANC_b
+        actionable_capacity = TW_cap_current + Q2_cap_current
+        backlog_months = actionable_backlog / actionable_capacity if actionable_capacity > 0 else np.nan
+
+        # Tailwind removal when actionable backlog months <= threshold
+        if (tailwind_active and apply_flow and actionable_capacity > 0
+                and backlog_months <= removal_threshold_months):
+            tailwind_active = False
+            ANC_b += TW_b
+            TW_b = 0.0
+            actionable_backlog = ANC_b
+            actionable_capacity = Q2_capacity_base
+            backlog_months = actionable_backlog / actionable_capacity if actionable_capacity > 0 else np.nan
+
+        out[month, 0] = actionable_backlog + NANC_b
+        out[month, 1] = TW_b
+        out[month, 2] = NANC_b
+        out[month, 3] = ANC_b
+        out[month, 4] = actionable_backlog
+        out[month, 5] = actionable_capacity
+        out[month, 6] = backlog_months
+        out[month, 7] = 1.0 if tailwind_active else 0.0
+
+    return out
+
+
 def run_tailwind_model(
     total_backlog: float,
     total_TW_backlog: float,
@@ -522,118 +920,148 @@ def run_tailwind_model(
     ANC_b = max(total_backlog - total_TW_backlog - total_NANC_backlog, 0.0)
 
     # Capacities (hours/month)
-    TW_capacity_base = tw_headcount * (2080 / 12) * utilization
-    Q2_capacity_base = q2_headcount * (2080 / 12) * utilization
-
-    tailwind_active = True
-    results = []
-
-    for month in range(0, months + 1):
-        apply_flow = month > 0
-
-        # -----------------------------
-        # Determine capacities this month
-        # -----------------------------
-        if tailwind_active:
-            TW_cap_current = TW_capacity_base
-            if tw_capacity_reduction_month and month >= tw_capacity_reduction_month:
-                TW_cap_current *= 0.5
-            Q2_cap_current = Q2_capacity_base
-        else:
-            TW_cap_current = 0.0
-            Q2_cap_current = Q2_capacity_base
-
-        # -----------------------------
-        # Determine incoming demand this month
-        # -----------------------------
-        if not apply_flow:
-            TW_incoming = 0.0
-            ANC_incoming = 0.0
-        else:
-            # While Tailwind is active, we may swap in the post-12-months quarterly demand.
-            active_qtr_demand = qtr_demand_total
-            if modify_demand_after_12_months and month >= 13:
-                active_qtr_demand = post_12_qtr_demand_total if post_12_qtr_demand_total is not None else qtr_demand_total
-
-            if tailwind_active:
-                TW_incoming = active_qtr_demand * tw_share_of_demand * (1 / 3)
-                ANC_incoming = active_qtr_demand * (1 - tw_share_of_demand) * (1 / 3)
-            else:
-                # After Tailwind removal, all demand is treated as actionable and lands in ANC.
-                if model_diff_demand_after_removal:
-                    effective_qtr = post_removal_qtr_demand_total if post_removal_qtr_demand_total is not None else qtr_demand_total
-                    ANC_incoming = effective_qtr * (1 / 3)
-                else:
-                    # Continue baseline demand after removal (including the post-12-month swap if enabled).
-                    ANC_incoming = active_qtr_demand * (1 / 3)
-                TW_incoming = 0.0
-
-        # -----------------------------
-        # Shift NANC -> actionable
-        # -----------------------------
-        if apply_flow:
-            shift = float(tw_shift_map.get(month, 0.0) or 0.0)
-            if shift > 0:
-                actual_shift = min(NANC_b, shift)
-                NANC_b -= actual_shift
-                if tailwind_active:
-                    TW_b += actual_shift
-                else:
-                    # Tailwind removed: shifted work becomes actionable but lands in ANC
-                    ANC_b += actual_shift
-
-        # -----------------------------
-        # Burn (only actionable buckets)
-        # -----------------------------
-        if tailwind_active:
-            q2_to_anc = Q2_cap_current * float(q2_capacity_to_q2_pct)
-            q2_to_tw = Q2_cap_current - q2_to_anc
-
-            TW_burn_cap = TW_cap_current + q2_to_tw
-            ANC_burn_cap = q2_to_anc
-        else:
-            TW_burn_cap = 0.0
-            ANC_burn_cap = Q2_cap_current
-
-        TW_burn = min(TW_b, TW_burn_cap) if apply_flow else 0.0
-        ANC_burn = min(ANC_b, ANC_burn_cap) if apply_flow else 0.0
-
-        if apply_flow:
-            TW_b = max(TW_b - TW_burn + TW_incoming, 0.0)
-            ANC_b = max(ANC_b - ANC_burn + ANC_incoming, 0.0)
-
-        # -----------------------------
-        # Compute metrics & evaluate Tailwind removal threshold (actionable backlog only)
-        # -----------------------------
-        actionable_backlog = TW_b + ANC_b
-        total_backlog_now = actionable_backlog + NANC_b
-        actionable_capacity = TW_cap_current + Q2_cap_current
-        backlog_months = (actionable_backlog / actionable_capacity) if actionable_capacity > 0 else None
-
-        # Trigger Tailwind removal when actionable backlog months <= threshold
-        if tailwind_active and apply_flow and (backlog_months is not None) and (backlog_months <= removal_threshold_months):
-            tailwind_active = False
-
-            # Transfer remaining TW backlog to ANC (Tailwind work becomes Q2-owned)
-            ANC_b += TW_b
-            TW_b = 0.0
+    TW_capacity_base = tw_headcount * MONTHLY_HOURS * utilization
+    Q2_capacity_base = q2_headcount * MONTHLY_HOURS * utilization
+
+    months = int(months)
+    shift_vec = _shift_vec(tw_shift_map, months)
+
+    if post_removal_qtr_demand_total is None:
+        post_removal_qtr_demand_total = qtr_demand_total
+    if post_12_qtr_demand_total is None:
+        post_12_qtr_demand_total = qtr_demand_total
+
+    out = _burn_kernel(
+        months,
+        TW_b,
+        NANC_b,
+        ANC_b,
+        float(TW_capacity_base),
+        float(Q2_capacity_base),
+        float(qtr_demand_total),
+        float(tw_share_of_demand),
+        float(q2_capacity_to_q2_pct),
+        float(removal_threshold_months),
+        int(tw_capacity_reduction_month or 0),
+        shift_vec,
+        bool(model_diff_demand_after_removal),
+        float(post_removal_qtr_demand_total),
+        bool(modify_demand_after_12_months),
+        float(post_12_qtr_demand_total),
+    )
 
-            # Recompute with Q2-only capacity
-            actionable_backlog = TW_b + ANC_b
-            total_backlog_now = actionable_backlog + NANC_b
-            actionable_capacity = Q2_capacity_base
-            backlog_months = (actionable_backlog / actionable_capacity) if actionable_capacity > 0 else None
-
-        results.append({
-            "Month": month,
-            "Total_Backlog": total_backlog_now,
-            "TW_Backlog": TW_b,
-            "NANC_Backlog": NANC_b,
-            "ANC_Backlog": ANC_b,
-            "Actionable_Backlog": actionable_backlog,
-            "Total_Capacity": actionable_capacity,
-            "Backlog_Months": backlog_months,
-            "Tailwind_Active": tailwind_active,
-        })
-
-    return pd.DataFrame(results)
+    return pd.DataFrame({
+        "Month": np.arange(months + 1),
+        "Total_Backlog": out[:, 0],
+        "TW_Backlog": out[:, 1],
+        "NANC_Backlog": out[:, 2],
+        "ANC_Backlog": out[:, 3],
+        "Actionable_Backlog": out[:, 4],
+        "Total_Capacity": out[:, 5],
+        "Backlog_Months": out[:, 6],
+        "Tailwind_Active": out[:, 7].astype(bool),
+    })
+
+
+def run_tailwind_model_batch(params: dict, months: int, tw_shift_map: dict) -> np.ndarray:
+    """Run K scenarios of run_tailwind_model at once, vectorized across scenarios.
+
+    `params` maps run_tailwind_model argument names to scalars or length-K
+    arrays (broadcast together; NaN in a post_*_qtr_demand_total array means
+    None). Returns shape (K, months + 1, 8) with _burn_kernel's columns.
+    """
+    names = [
+        "total_backlog", "total_TW_backlog", "total_NANC_backlog", "tw_headcount",
+        "q2_headcount", "utilization", "qtr_demand_total", "tw_share_of_demand",
+    ]
+    defaults = {
+        "q2_capacity_to_q2_pct": 1.0,
+        "removal_threshold_months": 12.0,
+        "tw_capacity_reduction_month": 0,
+        "model_diff_demand_after_removal": False,
+        "post_removal_qtr_demand_total": np.nan,
+        "modify_demand_after_12_months": False,
+        "post_12_qtr_demand_total": np.nan,
+    }
+    values = [params[n] for n in names]
+    values += [defaults[n] if params.get(n) is None else params[n] for n in defaults]
+    (total, tw_total, nanc_total, tw_hc, q2_hc, util, qtr, share,
+     pct, threshold, reduce_month, diff_after_removal, post_removal,
+     after_12, post_12) = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in values])
+    diff_after_removal = diff_after_removal.astype(bool)
+    after_12 = after_12.astype(bool)
+    post_removal = np.where(np.isnan(post_removal), qtr, post_removal)
+    post_12 = np.where(np.isnan(post_12), qtr, post_12)
+
+    months = int(months)
+    shift_vec = _shift_vec(tw_shift_map, months)
+
+    TW_b = np.maximum(tw_total, 0.0)
+    NANC_b = np.maximum(nanc_total, 0.0)
+    ANC_b = np.maximum(total - tw_total - nanc_total, 0.0)
+    TW_capacity_base = tw_hc * MONTHLY_HOURS * util
+    Q2_capacity_base = q2_hc * MONTHLY_HOURS * util
+    reduced = reduce_month > 0
+
+    K = TW_b.shape[0]
+    out = np.empty((K, months + 1, 8), dtype=np.float64)
+    active = np.ones(K, dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for month in range(months + 1):
+            TW_cap = np.where(
+                active,
+                np.where(reduced & (month >= reduce_month), TW_capacity_base * 0.5, TW_capacity_base),
+                0.0,
+            )
+            Q2_cap = Q2_capacity_base
+
+            if month > 0:
+                aq = np.where(after_12 & (month >= 13), post_12, qtr)
+                TW_in = np.where(active, aq * share * (1 / 3), 0.0)
+                ANC_in = np.where(
+                    active,
+                    aq * (1 - share) * (1 / 3),
+                    np.where(diff_after_removal, post_removal * (1 / 3), aq * (1 / 3)),
+                )
+
+                shift = shift_vec[month]
+                if shift > 0:
+                    actual_shift = np.minimum(NANC_b, shift)
+                    NANC_b = NANC_b - actual_shift
+                    TW_b = np.where(active, TW_b + actual_shift, TW_b)
+                    ANC_b = np.where(active, ANC_b, ANC_b + actual_shift)
+
+                ANC_burn_cap = np.where(active, Q2_cap * pct, Q2_cap)
+                TW_burn_cap = np.where(active, TW_cap + (Q2_cap - ANC_burn_cap), 0.0)
+                TW_b = np.maximum(TW_b - np.minimum(TW_b, TW_burn_cap) + TW_in, 0.0)
+                ANC_b = np.maximum(ANC_b - np.minimum(ANC_b, ANC_burn_cap) + ANC_in, 0.0)
+
+            actionable = TW_b + ANC_b
+            capacity = TW_cap + Q2_cap
+            backlog_months = np.where(capacity > 0, actionable / capacity, np.nan)
+
+            if month > 0:
+                # Tailwind removal when actionable backlog months <= threshold
+                removed = active & (capacity > 0) & (backlog_months <= threshold)
+                ANC_b = np.where(removed, ANC_b + TW_b, ANC_b)
+                TW_b = np.where(removed, 0.0, TW_b)
+                active &= ~removed
+                actionable = np.where(removed, ANC_b, actionable)
+                capacity = np.where(removed, Q2_capacity_base, capacity)
+                backlog_months = np.where(
+                    removed,
+                    np.where(Q2_capacity_base > 0, ANC_b / Q2_capacity_base, np.nan),
+                    backlog_months,
+                )
+
+            out[:, month, 0] = actionable + NANC_b
+            out[:, month, 1] = TW_b
+            out[:, month, 2] = NANC_b
+            out[:, month, 3] = ANC_b
+            out[:, month, 4] = actionable
+            out[:, month, 5] = capacity
+            out[:, month, 6] = backlog_months
+            out[:, month, 7] = active
+
+    return out
@@ -1,51 +1,68 @@
 # backlog_burndown.py
 
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 import snowflake.connector
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
 # ------------------------------------------------------------------
 # 1. SNOWFLAKE QUERY + DATA LOAD
 # ------------------------------------------------------------------
 
-BURNDOWN_SQL = """
-WITH
-/* ---------- Mavenlink workspaces ---------- */
-ml_workspace AS (
-  SELECT
-      w.ID::STRING                                AS workspace_id,
-      NULLIF(TRIM(w.CUSTOM_WORK_ORDER_ID), '')    AS custom_work_order_id,
-      NULLIF(TRIM(w.CUSTOM_WORK_ORDER), '')       AS custom_work_order,
-      NULLIF(TRIM(w.CUSTOM_PROJECT_SUB_TYPE), '') AS custom_project_sub_type
-  FROM Q2_ODS.MAVENLINK.WORKSPACE w
-),
+# Bind values for the BURNDOWN_SQL WHERE clause (pyformat; tuples expand to IN lists)
+BURNDOWN_PARAMS = {
+    "project_sub_type": "PROSERV",
+    "delivery_teams": ("CD - Wedge", "CD - Product SDK"),
+    "closed_statuses": ("Cancelled", "Completed", "Customer Requested Cancellation", "In Question"),
+}
 
-/* ---------- Map workspace -> Salesforce WO (ID first, fallback name), de-dup ---------- */
-ws_map_id AS (
-  SELECT ms.workspace_id, wo.ID::STRING AS wo_id, wo.NAME AS wo_code, 1 AS prio
-  FROM ml_workspace ms
-  JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C wo
-    ON UPPER(TRIM(wo.ID::STRING)) = UPPER(TRIM(ms.custom_work_order_id))
-),
-ws_map_name AS (
-  SELECT ms.workspace_id, wo.ID::STRING AS wo_id, wo.NAME AS wo_code, 2 AS prio
-  FROM ml_workspace ms
-  JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C wo
-    ON ms.custom_work_order_id IS NULL
-   AND UPPER(TRIM(wo.NAME)) = UPPER(TRIM(ms.custom_work_order))
-),
-ws_to_wo AS (
-  SELECT workspace_id, wo_id, wo_code
-  FROM (
-    SELECT m.*,
-           ROW_NUMBER() OVER (PARTITION BY m.workspace_id ORDER BY m.prio) AS rn
-    FROM (SELECT * FROM ws_map_id UNION ALL SELECT * FROM ws_map_name) m
-  ) x
-  WHERE rn = 1
-),
 
-/* ---------- Mavenlink: aggregate once per workspace×user (COALESCE user_id -> -1) ---------- */
-time_by_ws_user AS (
+
+
+def _sql_list(values) -> str:
+    """Inline a tuple of trusted string constants as a SQL IN-list."""
+    return ", ".join("'" + v.replace("'", "''") + "'" for v in values)
+
+
+# Clustering for the ODS source tables (run once by the table owner, not by the app).
+# WORK_ORDER_C is filtered by team/status in WO_BASE; TIME_ENTRY is aggregated and
+# joined by workspace.
+BURNDOWN_CLUSTERING_DDL = (
+    "ALTER TABLE Q2_ODS.SALESFORCE.WORK_ORDER_C CLUSTER BY (DELIVERY_TEAM_C, STATUS_C)",
+    "ALTER TABLE Q2_ODS.MAVENLINK.TIME_ENTRY CLUSTER BY (WORKSPACE_ID)",
+)
+
+
+# ------------------------------------------------------------------
+# Dynamic tables behind the expensive BURNDOWN_SQL CTEs.
+# Snowflake keeps them current (TARGET_LAG below; source tables change hourly
+# at most), so a burndown run joins pre-aggregated tables instead of
+# recomputing them. Materialized views can't express these (joins, window
+# functions), hence dynamic tables. Every fetch runs
+# create_burndown_dynamic_tables() first, so any that are missing get built.
+# ------------------------------------------------------------------
+
+BURNDOWN_DT_SCHEMA = "Q2_ODS.BURNDOWN"
+BURNDOWN_DT_TARGET_LAG = "1 hour"
+BURNDOWN_DT_WAREHOUSE = "Q2_WH_BI"
+
+# name -> (cluster key, SELECT)
+BURNDOWN_DYNAMIC_TABLES = {
+    "TIME_BY_WS_USER": ("workspace_id", """
   SELECT
       te.WORKSPACE_ID::STRING AS workspace_id,
       COALESCE(te.USER_ID, -1) AS user_id_num,
@@ -54,8 +71,8 @@ time_by_ws_user AS (
   WHERE te.approved = TRUE
     AND te._fivetran_deleted = FALSE
   GROUP BY te.WORKSPACE_ID, COALESCE(te.USER_ID, -1)
-),
-alloc_by_ws_user AS (
+"""),
+    "ALLOC_BY_WS_USER": ("workspace_id", """
   SELECT
       wr.WORKSPACE_ID::STRING AS workspace_id,
       COALESCE(wr.USER_ID, -1) AS user_id_num,
@@ -65,64 +82,33 @@ alloc_by_ws_user AS (
     ON wa.WORKSPACE_RESOURCE_ID = wr.ID
   WHERE wa._FIVETRAN_DELETED = FALSE
   GROUP BY wr.WORKSPACE_ID, COALESCE(wr.USER_ID, -1)
-),
-users_in_ws AS (
-  SELECT workspace_id, user_id_num FROM alloc_by_ws_user
-  UNION
-  SELECT workspace_id, user_id_num FROM time_by_ws_user
-),
-ml_user_hours AS (
-  SELECT
-      u.workspace_id,
-      map.wo_id,
-      map.wo_code,
-      u.user_id_num,
-      COALESCE(a.allocated_hours, 0)::NUMBER(18,2) AS allocated_hours,
-      COALESCE(t.hours_logged,    0)::NUMBER(18,2) AS hours_logged
-  FROM users_in_ws u
-  JOIN ws_to_wo map ON map.workspace_id = u.workspace_id
-  LEFT JOIN alloc_by_ws_user a
-    ON a.workspace_id = u.workspace_id AND a.user_id_num = u.user_id_num
-  LEFT JOIN time_by_ws_user t
-    ON t.workspace_id = u.workspace_id AND t.user_id_num = u.user_id_num
-),
-
-/* ---------- Latest Role per workspace×user ---------- */
-wr_latest AS (
-  SELECT
-      wr.WORKSPACE_ID::STRING AS workspace_id,
-      wr.USER_ID              AS user_id_num,
-      COALESCE(wr.ROLE_NAME,'Unassigned') AS role_name
-  FROM Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE wr
-  QUALIFY ROW_NUMBER() OVER (
-    PARTITION BY wr.WORKSPACE_ID, wr.USER_ID
-    ORDER BY wr.UPDATED_AT DESC, wr.ID DESC
-  ) = 1
-),
-
-/* ---------- WOLI lists per WO (IDs, Names, Count) ---------- */
-woli_lists_by_wo AS (
+"""),
+    "WOLI_LISTS_BY_WO": ("wo_id", """
   SELECT
     woli.WORK_ORDER_C::STRING AS wo_id,
     COUNT(DISTINCT woli.ID)   AS woli_count,
-    LISTAGG(DISTINCT woli.ID::STRING, ', ')   AS woli_ids,
-    LISTAGG(DISTINCT woli.NAME, ', ')         AS woli_names
+    ARRAY_AGG(DISTINCT woli.ID::STRING)      AS woli_ids,
+    ARRAY_AGG(DISTINCT woli.NAME)            AS woli_names
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_LINE_ITEM_C woli
   GROUP BY woli.WORK_ORDER_C
-),
-
-/* ---------- Distinct Product names per WO ---------- */
-products_by_wo AS (
+"""),
+    "PRODUCTS_BY_WO": ("wo_id", """
   SELECT
     woli.WORK_ORDER_C::STRING AS wo_id,
     LISTAGG(DISTINCT p2.NAME, ', ') WITHIN GROUP (ORDER BY p2.NAME) AS product_names
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_LINE_ITEM_C woli
   LEFT JOIN Q2_ODS.SALESFORCE.PRODUCT_2 p2 ON p2.ID = woli.PRODUCT_C
   GROUP BY woli.WORK_ORDER_C
-),
-
-/* ---------- Salesforce WO header + Contingent WO linkage + Record Type ---------- */
-wo_base AS (
+"""),
+    # Before WO_BASE, which joins it
+    "WO_NAME_TO_ID": ("wo_name", """
+  SELECT
+    wo.NAME               AS wo_name,
+    MAX(wo.ID)            AS wo_id
+  FROM Q2_ODS.SALESFORCE.WORK_ORDER_C wo
+  GROUP BY wo.NAME
+"""),
+    "WO_BASE": ("wo_id", """
   SELECT
     wo.ID::STRING             AS wo_id,
     wo.NAME                   AS wo_code,
@@ -165,23 +151,15 @@ wo_base AS (
       ELSE pwo.PROJECT_START_DATE_C
     END AS contingent_wo_start_date,
 
-    /* Contingent go-live:
-       1. If contingent WO has REVISED_GO_LIVE_DATE_C, use it.
-       2. Else fallback to later of (today + 6 months) OR (contingent start + 6 months).
-    */
+    /* Contingent WO revised go-live (raw). The CURRENT_DATE-based fallback
+       is applied in BURNDOWN_SQL so this table stays deterministic and can
+       refresh incrementally. */
     CASE
       WHEN wo.PLATFORM_WO_FOR_RFA_C IS NULL
            OR TRIM(wo.PLATFORM_WO_FOR_RFA_C) = ''
       THEN NULL
-
-      WHEN pwo.REVISED_GO_LIVE_DATE_C IS NOT NULL
-      THEN pwo.REVISED_GO_LIVE_DATE_C
-
-      ELSE GREATEST(
-             DATEADD(month, 6, CURRENT_DATE),
-             DATEADD(month, 6, COALESCE(pwo.PROJECT_START_DATE_C, CURRENT_DATE))
-           )
-    END AS contingent_wo_go_live_date,
+      ELSE pwo.REVISED_GO_LIVE_DATE_C
+    END AS contingent_wo_revised_go_live_date,
 
     /* Record Type Id forced to text + inline mapping to name */
     o.RECORD_TYPE_ID::STRING              AS opportunity_record_type_id,
@@ -204,10 +182,114 @@ wo_base AS (
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_C wo
   LEFT JOIN Q2_ODS.SALESFORCE.OPPORTUNITY o
     ON o.ID = wo.OPPORTUNITY_C
+  /* Contingent WO: resolve NAME -> ID once, then join WORK_ORDER_C on its key */
+  LEFT JOIN """ + BURNDOWN_DT_SCHEMA + """.WO_NAME_TO_ID n
+    ON n.wo_name = wo.PLATFORM_WO_FOR_RFA_C
   LEFT JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C pwo
-    ON pwo.NAME = wo.PLATFORM_WO_FOR_RFA_C
+    ON pwo.ID = n.wo_id
+  /* Only the delivery teams / open statuses the burndown uses (prunes WORK_ORDER_C) */
+  WHERE wo.DELIVERY_TEAM_C IN (""" + _sql_list(BURNDOWN_PARAMS["delivery_teams"]) + """)
+    AND (wo.STATUS_C IS NULL
+         OR wo.STATUS_C NOT IN (""" + _sql_list(BURNDOWN_PARAMS["closed_statuses"]) + """))
+"""),
+}
+
+
+def create_burndown_dynamic_tables(cur):
+    """Create (if missing) the dynamic tables BURNDOWN_SQL reads from."""
+    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {BURNDOWN_DT_SCHEMA}")
+    for name, (cluster_key, select_sql) in BURNDOWN_DYNAMIC_TABLES.items():
+        cur.execute(
+            f"CREATE DYNAMIC TABLE IF NOT EXISTS {BURNDOWN_DT_SCHEMA}.{name} "
+            f"TARGET_LAG = '{BURNDOWN_DT_TARGET_LAG}' "
+            f"WAREHOUSE = {BURNDOWN_DT_WAREHOUSE} "
+            f"CLUSTER BY ({cluster_key}) "
+            f"AS {select_sql}"
+        )
+
+
+BURNDOWN_SQL = """
+WITH
+/* ---------- Mavenlink workspaces ---------- */
+ml_workspace AS (
+  SELECT
+      w.ID::STRING                                AS workspace_id,
+      NULLIF(TRIM(w.CUSTOM_WORK_ORDER_ID), '')    AS custom_work_order_id,
+      NULLIF(TRIM(w.CUSTOM_WORK_ORDER), '')       AS custom_work_order,
+      NULLIF(TRIM(w.CUSTOM_PROJECT_SUB_TYPE), '') AS custom_project_sub_type
+  FROM Q2_ODS.MAVENLINK.WORKSPACE w
+),
+
+/* ---------- Map workspace -> Salesforce WO (ID first, fallback name), de-dup ---------- */
+ws_map_id AS (
+  SELECT ms.workspace_id, wo.ID::STRING AS wo_id, wo.NAME AS wo_code, 1 AS prio
+  FROM ml_workspace ms
+  JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C wo
+    ON UPPER(TRIM(wo.ID::STRING)) = UPPER(TRIM(ms.custom_work_order_id))
+),
+ws_map_name AS (
+  SELECT ms.workspace_id, wo.ID::STRING AS wo_id, wo.NAME AS wo_code, 2 AS prio
+  FROM ml_workspace ms
+  JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C wo
+    ON ms.custom_work_order_id IS NULL
+   AND UPPER(TRIM(wo.NAME)) = UPPER(TRIM(ms.custom_work_order))
+),
+ws_to_wo AS (
+  SELECT workspace_id, wo_id, wo_code
+  FROM (
+    SELECT m.*,
+           ROW_NUMBER() OVER (PARTITION BY m.workspace_id ORDER BY m.prio) AS rn
+    FROM (SELECT * FROM ws_map_id UNION ALL SELECT * FROM ws_map_name) m
+  ) x
+  WHERE rn = 1
+),
+
+/* ---------- Mavenlink: aggregate once per workspace×user (COALESCE user_id -> -1) ---------- */
+time_by_ws_user AS (SELECT * FROM {dt}.TIME_BY_WS_USER),
+alloc_by_ws_user AS (SELECT * FROM {dt}.ALLOC_BY_WS_USER),
+users_in_ws AS (
+  SELECT workspace_id, user_id_num FROM alloc_by_ws_user
+  UNION
+  SELECT workspace_id, user_id_num FROM time_by_ws_user
+),
+ml_user_hours AS (
+  SELECT
+      u.workspace_id,
+      map.wo_id,
+      map.wo_code,
+      u.user_id_num,
+      COALESCE(a.allocated_hours, 0)::NUMBER(18,2) AS allocated_hours,
+      COALESCE(t.hours_logged,    0)::NUMBER(18,2) AS hours_logged
+  FROM users_in_ws u
+  JOIN ws_to_wo map ON map.workspace_id = u.workspace_id
+  LEFT JOIN alloc_by_ws_user a
+    ON a.workspace_id = u.workspace_id AND a.user_id_num = u.user_id_num
+  LEFT JOIN time_by_ws_user t
+    ON t.workspace_id = u.workspace_id AND t.user_id_num = u.user_id_num
+),
+
+/* ---------- Latest Role per workspace×user ---------- */
+wr_latest AS (
+  SELECT
+      wr.WORKSPACE_ID::STRING AS workspace_id,
+      wr.USER_ID              AS user_id_num,
+      COALESCE(wr.ROLE_NAME,'Unassigned') AS role_name
+  FROM Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE wr
+  QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY wr.WORKSPACE_ID, wr.USER_ID
+    ORDER BY wr.UPDATED_AT DESC, wr.ID DESC
+  ) = 1
 ),
 
+/* ---------- WOLI lists per WO (IDs, Names, Count) ---------- */
+woli_lists_by_wo AS (SELECT * FROM {dt}.WOLI_LISTS_BY_WO),
+
+/* ---------- Distinct Product names per WO ---------- */
+products_by_wo AS (SELECT * FROM {dt}.PRODUCTS_BY_WO),
+
+/* ---------- Salesforce WO header + Contingent WO linkage + Record Type ---------- */
+wo_base AS (SELECT * FROM {dt}.WO_BASE),
+
 sf_account AS (
   SELECT a.ID::STRING AS account_id,
          a.NAME       AS account_name,
@@ -242,7 +324,18 @@ SELECT
   wb.slotted_go_live_date                    AS "Slotted Go-Live Date",
   wa.project_sub_type                        AS "Project Sub-Type",
   wb.contingent_wo_code                      AS "Contingent Work Order",
-  wb.contingent_wo_go_live_date              AS "Contingent Go-Live Date",
+  /* Contingent go-live: contingent WO's revised go-live if set, else later of
+     (today + 6 months) or (contingent start + 6 months) */
+  CASE
+    WHEN wb.platform_wo_for_rfa_id IS NULL
+         OR TRIM(wb.platform_wo_for_rfa_id) = ''       THEN NULL
+    WHEN wb.contingent_wo_revised_go_live_date IS NOT NULL
+                                                       THEN wb.contingent_wo_revised_go_live_date
+    ELSE GREATEST(
+           DATEADD(month, 6, CURRENT_DATE),
+           DATEADD(month, 6, COALESCE(wb.contingent_wo_start_date, CURRENT_DATE))
+         )
+  END                                        AS "Contingent Go-Live Date",
   wb.analysis_outlier_reason                 AS "Analysis Outlier Reason",
   wb.delivery_team                           AS "Delivery Team",
 
@@ -306,13 +399,156 @@ LEFT JOIN wr_latest wr               ON wr.workspace_id = ml.workspace_id
                                      AND wr.user_id_num = ml.user_id_num
 LEFT JOIN Q2_ODS.MAVENLINK.USER mu   ON mu.ID           = ml.user_id_num
 
-ORDER BY "Account Name", "Work Order Code", "Mavenlink User Name"
-"""
+/* Only rows build_backlog_views() can use (allWOs ⊇ allTWWOs, allNANCWOs) */
+WHERE wa.project_sub_type = %(project_sub_type)s
+  AND wb.delivery_team IN %(delivery_teams)s
+  AND (wb.project_status_sf IS NULL OR wb.project_status_sf NOT IN %(closed_statuses)s)
+""".format(dt=BURNDOWN_DT_SCHEMA)
+
+# Results at or above this many rows are unloaded to a stage as Parquet instead
+# of being streamed through the cursor.
+STAGE_UNLOAD_MIN_ROWS = 100_000
+
+
+def _unload_result_via_stage(cur, query_id: str):
+    """COPY a finished query's result to the user stage as Parquet, GET it, read it with Arrow."""
+    stage_path = f"@~/burndown/{query_id}/"
+    cur.execute(
+        f"COPY INTO {stage_path} "
+        f"FROM (SELECT * FROM TABLE(RESULT_SCAN('{query_id}'))) "
+        "FILE_FORMAT = (TYPE = PARQUET) HEADER = TRUE OVERWRITE = TRUE "
+        "MAX_FILE_SIZE = 256000000"
+    )
+    try:
+        with tempfile.TemporaryDirectory(prefix="burndown_") as local_dir:
+            cur.execute(f"GET {stage_path} 'file://{local_dir}/'")
+            tbl = pq.read_table(local_dir, use_threads=True)
+    finally:
+        cur.execute(f"REMOVE {stage_path}")
+    return tbl
+
+
+# Per-user columns of BURNDOWN_SQL; everything else is constant per work order.
+USER_DETAIL_COLUMNS = ("Mavenlink User Name", "User Name", "Mavenlink User Id", "Role Name")
 
+HOUR_COLUMNS = ("Allocated Hours (User×CWO)", "Hours Logged (User×CWO)")
 
-def fetch_backlog_df():
-    """Pulls the raw dataframe from Snowflake using your SQL."""
-    conn = snowflake.connector.connect(
+# Per-WO WOLI ID/name arrays: display-only, so left out of extracts unless asked for
+WOLI_DETAIL_COLUMNS = ("Work Order Line Item Ids", "Work Order Line Item Names")
+
+# Columns build_backlog_views() actually reads
+REQUIRED_COLUMNS = [
+    "Work Order Code",
+    "Delivery Team",
+    "Project Status",
+    "Project Sub-Type",
+    "Account Name",
+    "Work Order Description",
+    "Contingent Work Order",
+    "Contingent Go-Live Date",
+    "Slotted Go-Live Date",
+    *HOUR_COLUMNS,
+]
+
+
+def burndown_wo_sql(columns=None) -> str:
+    """
+    One row per WO with the user-level hours summed server-side, so the per-WO
+    pipeline doesn't ship the user fan-out just to aggregate it back in pandas.
+    Only `columns` (default REQUIRED_COLUMNS) are selected, which also lets
+    Snowflake prune the unused joins.
+    """
+    keys = [
+        c for c in (columns or REQUIRED_COLUMNS)
+        if c not in HOUR_COLUMNS and c not in USER_DETAIL_COLUMNS
+    ]
+    select = [f'"{c}"' for c in keys] + [f'SUM("{c}") AS "{c}"' for c in HOUR_COLUMNS]
+    return (
+        "SELECT\n  " + ",\n  ".join(select) + "\n"
+        + "FROM (" + BURNDOWN_SQL + ")\n"
+        + "GROUP BY ALL"
+    )
+
+
+# Local copies of the last extracts, reused while the source tables are unchanged
+CACHE_DIR = Path(".cache")
+
+# Raw tables BURNDOWN_SQL still reads directly. They are Fivetran-synced, so
+# MAX(_FIVETRAN_SYNCED) moves whenever any of them picks up new or changed rows.
+FRESHNESS_SQL = " UNION ALL ".join(
+    f"SELECT MAX(_FIVETRAN_SYNCED)::STRING FROM {t}"
+    for t in (
+        "Q2_ODS.MAVENLINK.WORKSPACE",
+        "Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE",
+        "Q2_ODS.MAVENLINK.USER",
+        "Q2_ODS.SALESFORCE.WORK_ORDER_C",
+        "Q2_ODS.SALESFORCE.ACCOUNT",
+        "Q2_ODS.SALESFORCE.USER",
+    )
+)
+
+# Everything else comes from the dynamic tables, which trail their sources by up
+# to TARGET_LAG; key on what they actually contain (data_timestamp), not on
+# the source tables' sync times.
+DT_FRESHNESS_SQL = (
+    f"SHOW DYNAMIC TABLES IN SCHEMA {BURNDOWN_DT_SCHEMA}",
+    'SELECT "name", "data_timestamp"::STRING FROM TABLE(RESULT_SCAN(LAST_QUERY_ID())) ORDER BY "name"',
+)
+
+# Low-cardinality string columns: filters/groupbys become integer-code ops
+CATEGORY_COLUMNS = ("Delivery Team", "Project Status", "Project Sub-Type", "Account Name", "Role Name")
+
+
+def _freshness_key(cur) -> str:
+    """Hash of the raw tables' last sync times, the dynamic tables' data timestamps,
+    today's date (the Contingent Go-Live fallback uses CURRENT_DATE) and the binds."""
+    h = hashlib.sha256()
+    cur.execute(FRESHNESS_SQL)
+    for (synced,) in cur.fetchall():
+        h.update(str(synced).encode())
+    for sql in DT_FRESHNESS_SQL:
+        cur.execute(sql)
+    for name, data_ts in cur.fetchall():
+        h.update(f"{name}={data_ts}".encode())
+    h.update(date.today().isoformat().encode())
+    h.update(repr(sorted(BURNDOWN_PARAMS.items())).encode())
+    return h.hexdigest()
+
+
+def _fetch_cached(cur, name: str, sql: str, freshness: str) -> pd.DataFrame:
+    """Run `sql`, or return .cache/<name>.parquet if it was written for the same freshness key + SQL."""
+    key = hashlib.sha256((freshness + sql).encode()).hexdigest()
+    parquet_path = CACHE_DIR / f"{name}.parquet"
+    key_path = CACHE_DIR / f"{name}.key"
+
+    if parquet_path.exists() and key_path.exists() and key_path.read_text() == key:
+        print(f"✅ Source tables unchanged; using cached {name} extract.")
+        df = pd.read_parquet(parquet_path)
+    else:
+        cur.execute(sql, BURNDOWN_PARAMS)
+        if (cur.rowcount or 0) >= STAGE_UNLOAD_MIN_ROWS:
+            # Large result: let Snowflake write Parquet from the cached result
+            tbl = _unload_result_via_stage(cur, cur.sfqid)
+        else:
+            tbl = cur.fetch_arrow_all(force_return_table=True)
+        # Arrow result -> pandas directly (no per-batch pandas concat);
+        # self_destruct frees each Arrow column as it is converted.
+        df = tbl.to_pandas(split_blocks=True, self_destruct=True)
+        del tbl
+        print(f"✅ {name} from Snowflake successfully pulled.")
+
+        CACHE_DIR.mkdir(exist_ok=True)
+        df.to_parquet(parquet_path, compression="zstd")
+        key_path.write_text(key)
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _connect():
+    return snowflake.connector.connect(
         account="Q2-Q2EDW",
         user="THEBNER",
         role="DW_IMPL_USRS",
@@ -321,15 +557,42 @@ def fetch_backlog_df():
         schema="MAVENLINK",
         authenticator="externalbrowser",
     )
+
+
+def _fetch(name: str, sql: str) -> pd.DataFrame:
+    """Make sure the dynamic tables exist, then _fetch_cached(`sql`) on a fresh connection."""
+    conn = _connect()
     cur = conn.cursor()
     try:
-        cur.execute(BURNDOWN_SQL)
-        df = cur.fetch_pandas_all()
-        print("✅ Projects from Snowflake successfully pulled.")
+        create_burndown_dynamic_tables(cur)  # no-op once they exist
+        return _fetch_cached(cur, name, sql, _freshness_key(cur))
     finally:
         cur.close()
         conn.close()
-    return df
+
+
+def fetch_backlog_df(columns=None) -> pd.DataFrame:
+    """Pulls one row per work order (hours summed over users) from Snowflake.
+
+    This is what build_backlog_views() consumes; it carries REQUIRED_COLUMNS
+    unless a wider `columns` list is passed.
+    """
+    return _fetch("burndown_wo", burndown_wo_sql(columns))
+
+
+def fetch_backlog_user_detail(include_woli_detail: bool = False) -> pd.DataFrame:
+    """Pulls the full per-user×WO detail from Snowflake.
+
+    The WOLI ID/name arrays are only included with include_woli_detail=True.
+    """
+    sql = BURNDOWN_SQL
+    if not include_woli_detail:
+        sql = (
+            "SELECT * EXCLUDE ("
+            + ", ".join(f'"{c}"' for c in WOLI_DETAIL_COLUMNS)
+            + ") FROM (" + BURNDOWN_SQL + ")"
+        )
+    return _fetch("burndown_wo_user", sql)
 
 
 # ------------------------------------------------------------------
@@ -337,47 +600,32 @@ def fetch_backlog_df():
 # ------------------------------------------------------------------
 
 def build_backlog_views(df: pd.DataFrame):
-    """From raw df, build allWOs/allTWWOs/NANC and tw_shift_map and totals."""
+    """From the per-WO df, build allWOs/allTWWOs/NANC and tw_shift_map and totals."""
 
-    # Query for totals
-    dtquery = '`Delivery Team` in ["CD - Wedge","CD - Product SDK"]'
-    statusquery = '`Project Status` not in ["Cancelled", "Completed", "Customer Requested Cancellation", "In Question"]'
-    subtypequery = '`Project Sub-Type` == "PROSERV"'
+    # One pass over the three filter columns; subsets are boolean-mask slices
+    dt = df["Delivery Team"]
+    is_wedge = dt.eq("CD - Wedge").to_numpy()
+    is_sdk = dt.eq("CD - Product SDK").to_numpy()
+    is_proserv = df["Project Sub-Type"].eq(BURNDOWN_PARAMS["project_sub_type"]).to_numpy()
+    status = df["Project Status"]
+    good_status = ~status.isin(BURNDOWN_PARAMS["closed_statuses"]).to_numpy()
+    is_pending_ga = status.eq("Pending GA").to_numpy()
 
-    allWOs = (
-        df
-        .query(f"{dtquery} and {statusquery} and {subtypequery}")
-        .reset_index(drop=True)
-    )
-    allWOs = allWOs.rename(columns={
+    open_proserv = is_proserv & good_status
+
+    # Rename once on the full frame (no data copy under copy-on-write), then slice
+    wide = df.rename(columns={
         "Allocated Hours (User×CWO)": "Allocated_Hours",
         "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
+    })
+
+    allWOs = wide.loc[open_proserv & (is_wedge | is_sdk)]
 
     # Tailwind-only (CD - Wedge)
-    dtTWquery = '`Delivery Team` in ["CD - Wedge"]'
-    allTWWOs = (
-        df
-        .query(f"{dtTWquery} and {statusquery} and {subtypequery}")
-        .reset_index(drop=True)
-    )
-    allTWWOs = allTWWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
+    allTWWOs = wide.loc[open_proserv & is_wedge]
 
     # Non-Actionable Non-Certified (optional)
-    NANC_dtquery = '`Delivery Team` in ["CD - Product SDK"]'
-    NANC_statusquery = '`Project Status` in ["Pending GA"]'
-    allNANCWOs = (
-        df
-        .query(f"{NANC_dtquery} and {NANC_statusquery} and {subtypequery}")
-        .reset_index(drop=True)
-    )
-    allNANCWOs = allNANCWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
+    allNANCWOs = wide.loc[is_proserv & is_pending_ga & is_sdk]
 
     # Total backlog
     allocated_sum = allWOs["Allocated_Hours"].sum()
@@ -389,20 +637,26 @@ def build_backlog_views(df: pd.DataFrame):
     total_TW_backlog = float(TW_allocated_sum - TW_logged_sum)
 
     # Build shift map (Q2 -> TW) from Contingent WOs
-    wo_backlog = (
+    # Hours are per user×WO and get summed; the header columns are per-WO
+    # constants, so the first row of each WO carries them.
+    sums = (
         allWOs
-        .groupby("Work Order Code", as_index=False)
-        .agg({
-            "Allocated_Hours": "sum",
-            "Hours_Logged": "sum",
-            "Delivery Team": "first",
-            "Account Name": "first",
-            "Work Order Description": "first",
-            "Contingent Work Order": "first",
-            "Contingent Go-Live Date": "first",
-            "Slotted Go-Live Date": "first"
-        })
+        .groupby("Work Order Code", observed=True, sort=False)[["Allocated_Hours", "Hours_Logged"]]
+        .sum()
     )
+    firsts = (
+        allWOs
+        .drop_duplicates("Work Order Code", keep="first")
+        .set_index("Work Order Code")[[
+            "Delivery Team",
+            "Account Name",
+            "Work Order Description",
+            "Contingent Work Order",
+            "Contingent Go-Live Date",
+            "Slotted Go-Live Date",
+        ]]
+    )
+    wo_backlog = sums.join(firsts).reset_index()
 
     # Only rows with contingent work orders
     wo_backlog = wo_backlog.query("`Contingent Work Order`.notnull()")
@@ -416,22 +670,25 @@ def build_backlog_views(df: pd.DataFrame):
     is_tailwind = wo_backlog["Delivery Team"].eq("CD - Wedge")
     today = pd.Timestamp.today().normalize()
 
-    q2_wo = wo_backlog[~is_tailwind].copy()
-    eligible = q2_wo[
-        q2_wo["Contingent Work Order"].notna()
-        & q2_wo["Contingent Go-Live Date"].notna()
-    ].copy()
-
-    eligible["Days_To_GoLive"] = (eligible["Contingent Go-Live Date"] - today).dt.days
-    eligible["Months_To_GoLive"] = (
-        (eligible["Days_To_GoLive"] // 30)
-        .clip(lower=0)
-        .astype(int)
+    mask = (
+        ~is_tailwind
+        & wo_backlog["Contingent Work Order"].notna()
+        & wo_backlog["Contingent Go-Live Date"].notna()
+    )
+    this_month = today.to_datetime64().astype("datetime64[M]")
+    # Calendar-month difference (matches SQL DATEADD(month, ...)), not 30-day buckets
+    eligible = wo_backlog.loc[mask].assign(
+        Months_To_GoLive=lambda d: np.clip(
+            (d["Contingent Go-Live Date"].to_numpy().astype("datetime64[M]") - this_month)
+            .astype(np.int64),
+            0,
+            None,
+        ).astype(np.int32)
     )
 
     shift_schedule = (
         eligible
-        .groupby("Months_To_GoLive", as_index=False)["Backlog"]
+        .groupby("Months_To_GoLive", as_index=False, observed=True)["Backlog"]
         .sum()
         .rename(columns={
             "Months_To_GoLive": "Month",
@@ -439,10 +696,10 @@ def build_backlog_views(df: pd.DataFrame):
         })
     )
 
-    tw_shift_map = {
-        int(row["Month"]): float(row["Shift_Hours"])
-        for _, row in shift_schedule.iterrows()
-    }
+    tw_shift_map = dict(zip(
+        shift_schedule["Month"].astype(int).tolist(),
+        shift_schedule["Shift_Hours"].astype(float).tolist(),
+    ))
 
     return {
         "df": df,
@@ -461,80 +718,65 @@ def build_backlog_views(df: pd.DataFrame):
 # 3. BURNDOWN MODEL
 # ------------------------------------------------------------------
 
-def run_tailwind_model(
-    total_backlog: float,
-    total_TW_backlog: float,
-    tw_headcount: int,
-    q2_headcount: int,
-    utilization: float,
-    qtr_demand_total: float,
-    tw_share_of_demand: float,      # fraction 0–1
-    months: int,
-    tw_shift_map: dict,
-    removal_threshold_months: float,  # threshold in months at full capacity
-    # 1-based month; 0 disables reduction
-    tw_capacity_reduction_month: int = 0,
-    # If True, use a different quarterly demand once Tailwind removal threshold is reached
-    model_diff_demand_after_removal: bool = False,
-    post_removal_qtr_demand_total: float | None = None,
-    # If True, use a different quarterly demand starting in month 13 (months are 1-based)
-    modify_demand_after_12_months: bool = False,
-    post_12_qtr_demand_total: float | None = None,
-) -> pd.DataFrame:
-    """
-    Tailwind-removed model with Q2 -> TW eligibility shift.
-
-    Enhancements:
-      - Optional Tailwind capacity reduction month (50% starting in that month).
-      - Optional alternate incoming demand after Tailwind removal threshold is reached.
-      - Optional alternate incoming demand starting in month 13 ("after 12 months").
-
-    Demand precedence rules:
-      1) After Tailwind removal threshold is reached, if model_diff_demand_after_removal
-         is enabled, use post_removal_qtr_demand_total from the threshold month onward.
-      2) Otherwise, while Tailwind is active, if modify_demand_after_12_months is enabled,
-         use post_12_qtr_demand_total starting in month 13.
-      3) Otherwise, use qtr_demand_total.
+# Working hours per FTE per month
+MONTHLY_HOURS = 2080 / 12
+
+
+def _shift_array(tw_shift_map: dict, months: int) -> np.ndarray:
+    """Dense per-month Q2 -> TW shift hours (index = 0-based month_idx)."""
+    shift_arr = np.zeros(months, dtype=np.float64)
+    for m, v in tw_shift_map.items():
+        if 0 <= m < months:
+            shift_arr[m] = v
+    return shift_arr
+
+
+@njit(cache=True, nogil=True)
+def _simulate(
+    TW_b,
+    Q2_b,
+    TW_capacity,
+    Q2_capacity,
+    qtr_demand_total,
+    tw_share_of_demand,
+    months,
+    shift_arr,
+    removal_threshold_months,
+    tw_capacity_reduction_month,
+    model_diff_demand_after_removal,
+    post_removal_qtr_demand_total,
+    modify_demand_after_12_months,
+    post_12_qtr_demand_total,
+):
+    """Month-by-month burndown loop (see run_tailwind_model); None inputs resolved by the caller.
+
+    Returns per-month arrays: TW backlog, Q2 backlog, total backlog, capacity,
+    backlog months (NaN when capacity is 0) and Tailwind-active flag.
     """
-
-    TW_backlog = float(total_TW_backlog)
-    Q2_backlog = float(total_backlog - total_TW_backlog)
-
-    TW_capacity = tw_headcount * (2080/12) * utilization
-    Q2_capacity = q2_headcount * (2080/12) * utilization
-    total_capacity = TW_capacity + Q2_capacity
-
-    # Base monthly incoming (derived from quarterly demand)
-    TW_incoming_base = qtr_demand_total * tw_share_of_demand * (1/3)
-    Q2_incoming_base = qtr_demand_total * (1 - tw_share_of_demand) * (1/3)
-
-    TW_b = TW_backlog
-    Q2_b = Q2_backlog
+    # State is carried in float64; the stored trajectories only need float32
+    tw_out = np.empty(months, dtype=np.float32)
+    q2_out = np.empty(months, dtype=np.float32)
+    tot_out = np.empty(months, dtype=np.float32)
+    cap_out = np.empty(months, dtype=np.float32)
+    bm_out = np.empty(months, dtype=np.float32)
+    active_out = np.empty(months, dtype=np.bool_)
 
     tailwind_active = True
-    results_reduced = []
-
-    # Kept for backward compatibility (not used directly in threshold check)
-    threshold_hours = removal_threshold_months * total_capacity
 
-    for month in range(1, months + 1):
-        month_idx = month - 1
-
-        # -------------------------------------------------
-        # Capacity & incoming depend on Tailwind being active or not
-        # -------------------------------------------------
+    for month_idx in range(months):
+        month = month_idx + 1
 
         # Determine which quarterly demand to use while Tailwind is active.
         # Month numbering is 1-based; "after 12 months" means starting month 13.
         active_qtr_demand = qtr_demand_total
         if tailwind_active and modify_demand_after_12_months and month >= 13:
-            active_qtr_demand = post_12_qtr_demand_total if post_12_qtr_demand_total is not None else qtr_demand_total
+            active_qtr_demand = post_12_qtr_demand_total
 
         if tailwind_active:
             TW_cap_current = TW_capacity
 
             # Optional 50% capacity reduction starting at the specified (1-based) month
-            if tw_capacity_reduction_month and month >= tw_capacity_reduction_month:
+            if tw_capacity_reduction_month > 0 and month >= tw_capacity_reduction_month:
                 TW_cap_current *= 0.5
 
             TW_incoming_current = active_qtr_demand * tw_share_of_demand * (1/3)
@@ -545,13 +787,9 @@ def run_tailwind_model(
             TW_incoming_current = 0.0
             Q2_cap_current = Q2_capacity
 
-            # Optional: continue modeling incoming demand after Tailwind removal.
-            # If this is enabled, it takes precedence over the "after 12 months" demand.
+            # Post-removal demand takes precedence over the "after 12 months" demand
             if model_diff_demand_after_removal:
-                effective_qtr = post_removal_qtr_demand_total
-                if effective_qtr is None:
-                    effective_qtr = qtr_demand_total
-                Q2_incoming_current = effective_qtr * (1/3)
+                Q2_incoming_current = post_removal_qtr_demand_total * (1/3)
             else:
                 Q2_incoming_current = 0.0  # default: no new incoming after threshold
 
@@ -559,12 +797,12 @@ def run_tailwind_model(
         TW_burn = min(TW_b, TW_cap_current)
         Q2_burn = min(Q2_b, Q2_cap_current)
 
-        TW_b = max(TW_b - TW_burn + TW_incoming_current, 0)
-        Q2_b = max(Q2_b - Q2_burn + Q2_incoming_current, 0)
+        TW_b = max(TW_b - TW_burn + TW_incoming_current, 0.0)
+        Q2_b = max(Q2_b - Q2_burn + Q2_incoming_current, 0.0)
 
         # Apply Q2 -> Tailwind eligibility shift for this month (only while Tailwind is active)
         if tailwind_active:
-            shift = tw_shift_map.get(month_idx, 0.0)
+            shift = shift_arr[month_idx]
             if shift > 0:
                 actual_shift = min(Q2_b, shift)
                 Q2_b -= actual_shift
@@ -573,20 +811,15 @@ def run_tailwind_model(
         # Compute metrics before checking threshold
         total_b = TW_b + Q2_b
         total_cap_current = TW_cap_current + Q2_cap_current
-        backlog_months = total_b / total_cap_current if total_cap_current > 0 else None
+        backlog_months = total_b / total_cap_current if total_cap_current > 0 else np.nan
 
         # Trigger Tailwind removal when backlog months <= threshold
-        if tailwind_active and (backlog_months is not None) and (backlog_months <= removal_threshold_months):
+        if tailwind_active and backlog_months <= removal_threshold_months:
             tailwind_active = False
 
-            # If the user is modeling different incoming demand after Tailwind removal,
-            # apply it starting in the *threshold month* (i.e., as soon as the threshold
-            # is reached), rather than waiting until the following month.
+            # Post-removal demand applies from the threshold month itself
             if model_diff_demand_after_removal:
-                effective_qtr = post_removal_qtr_demand_total
-                if effective_qtr is None:
-                    effective_qtr = qtr_demand_total
-                effective_monthly = effective_qtr * (1/3)
+                effective_monthly = post_removal_qtr_demand_total * (1/3)
 
                 # Remove any Tailwind incoming applied this month (post-removal TW incoming = 0)
                 TW_b = max(TW_b - TW_incoming_current, 0.0)
@@ -594,24 +827,131 @@ def run_tailwind_model(
                 # Replace Q2 incoming for this month with the post-removal incoming demand
                 Q2_b = max(Q2_b + (effective_monthly - Q2_incoming_current), 0.0)
 
-            # ✅ Transfer any remaining Tailwind backlog to Q2
+            # Transfer any remaining Tailwind backlog to Q2
             Q2_b += TW_b
             TW_b = 0.0
 
             # Recompute totals with Q2-only capacity
             total_b = TW_b + Q2_b
             total_cap_current = Q2_capacity
-            backlog_months = total_b / total_cap_current if total_cap_current > 0 else None
-
-        results_reduced.append({
-            "Month": month,
-            "TW_Backlog": TW_b,
-            "Q2_Backlog": Q2_b,
-            "Total_Backlog": total_b,
-            "Total_Capacity": total_cap_current,
-            "Backlog_Months": backlog_months,
-            "Tailwind_Active": tailwind_active
-        })
+            backlog_months = total_b / total_cap_current if total_cap_current > 0 else np.nan
+
+        tw_out[month_idx] = TW_b
+        q2_out[month_idx] = Q2_b
+        tot_out[month_idx] = total_b
+        cap_out[month_idx] = total_cap_current
+        bm_out[month_idx] = backlog_months
+        active_out[month_idx] = tailwind_active
+
+    return tw_out, q2_out, tot_out, cap_out, bm_out, active_out
+
 
-    df_reduced = pd.DataFrame(results_reduced)
+def run_tailwind_model(
+    total_backlog: float,
+    total_TW_backlog: float,
+    tw_headcount: int,
+    q2_headcount: int,
+    utilization: float,
+    qtr_demand_total: float,
+    tw_share_of_demand: float,      # fraction 0–1
+    months: int,
+    tw_shift_map: dict,
+    removal_threshold_months: float,  # threshold in months at full capacity
+    # 1-based month; 0 disables reduction
+    tw_capacity_reduction_month: int = 0,
+    # If True, use a different quarterly demand once Tailwind removal threshold is reached
+    model_diff_demand_after_removal: bool = False,
+    post_removal_qtr_demand_total: float | None = None,
+    # If True, use a different quarterly demand starting in month 13 (months are 1-based)
+    modify_demand_after_12_months: bool = False,
+    post_12_qtr_demand_total: float | None = None,
+) -> pd.DataFrame:
+    """
+    Tailwind-removed model with Q2 -> TW eligibility shift.
+
+    Enhancements:
+      - Optional Tailwind capacity reduction month (50% starting in that month).
+      - Optional alternate incoming demand after Tailwind removal threshold is reached.
+      - Optional alternate incoming demand starting in month 13 ("after 12 months").
+
+    Demand precedence rules:
+      1) After Tailwind removal threshold is reached, if model_diff_demand_after_removal
+         is enabled, use post_removal_qtr_demand_total from the threshold month onward.
+      2) Otherwise, while Tailwind is active, if modify_demand_after_12_months is enabled,
+         use post_12_qtr_demand_total starting in month 13.
+      3) Otherwise, use qtr_demand_total.
+    """
+
+    TW_backlog = float(total_TW_backlog)
+    Q2_backlog = float(total_backlog - total_TW_backlog)
+
+    TW_capacity = tw_headcount * MONTHLY_HOURS * utilization
+    Q2_capacity = q2_headcount * MONTHLY_HOURS * utilization
+
+    months = int(months)
+    shift_arr = _shift_array(tw_shift_map, months)
+
+    if post_removal_qtr_demand_total is None:
+        post_removal_qtr_demand_total = qtr_demand_total
+    if post_12_qtr_demand_total is None:
+        post_12_qtr_demand_total = qtr_demand_total
+
+    tw, q2, tot, cap, bm, active = _simulate(
+        TW_backlog,
+        Q2_backlog,
+        float(TW_capacity),
+        float(Q2_capacity),
+        float(qtr_demand_total),
+        float(tw_share_of_demand),
+        months,
+        shift_arr,
+        float(removal_threshold_months),
+        int(tw_capacity_reduction_month or 0),
+        bool(model_diff_demand_after_removal),
+        float(post_removal_qtr_demand_total),
+        bool(modify_demand_after_12_months),
+        float(post_12_qtr_demand_total),
+    )
+
+    df_reduced = pd.DataFrame({
+        "Month": np.arange(1, months + 1, dtype=np.int16),
+        "TW_Backlog": tw,
+        "Q2_Backlog": q2,
+        "Total_Backlog": tot,
+        "Total_Capacity": cap,
+        "Backlog_Months": bm,
+        "Tailwind_Active": active,
+    })
     return df_reduced
+
+
+def run_tailwind_grid(
+    params_df: pd.DataFrame,
+    tw_shift_map: dict,
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    Run run_tailwind_model once per row of params_df (a scenario sweep).
+
+    Each row holds run_tailwind_model keyword arguments (total_backlog, tw_headcount,
+    utilization, ...); tw_shift_map is shared by all scenarios. The compiled kernel
+    releases the GIL, so scenarios run in parallel on a thread pool.
+
+    Returns the stacked trajectories with a leading scenario_id column (= params_df index).
+    """
+    scenario_ids = params_df.index.tolist()
+    rows = params_df.to_dict("records")
+
+    def _run(kwargs):
+        # Blank optional cells come through as NaN; the model wants None there
+        # (= fall back to qtr_demand_total), as run_tailwind_model_batch does
+        for key in ("post_removal_qtr_demand_total", "post_12_qtr_demand_total"):
+            if key in kwargs and pd.isna(kwargs[key]):
+                kwargs[key] = None
+        return run_tailwind_model(tw_shift_map=tw_shift_map, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = list(pool.map(_run, rows))
+
+    out = pd.concat(frames, keys=scenario_ids, names=["scenario_id", None])
+    return out.reset_index(level=0).reset_index(drop=True)
@@ -0,0 +1,374 @@
+# backlog_common.py
+"""Data loading, sidebar and chart code shared by the Archive app_* entry points.
+
+Keeping it in one module gives every entry point a single set of Streamlit caches
+(keyed by backend module name) instead of one private copy per script.
+"""
+
+import importlib
+import io
+import time
+from pathlib import Path
+from typing import Any, NamedTuple, Optional, Tuple
+
+import streamlit as st
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------------------------
+# 1. Load data from Snowflake (cached)
+# -------------------------------------------------
+
+_CACHE_DIR = Path(".cache")
+
+
+def _parquet_path(backend: str) -> Path:
+    return _CACHE_DIR / f"{backend}.parquet"
+
+
+def _fetch_cached(backend: str, ttl_sec: int = 3600) -> pd.DataFrame:
+    """backend.fetch_backlog_df() behind an on-disk parquet copy that survives restarts."""
+    p = _parquet_path(backend)
+    if p.exists() and time.time() - p.stat().st_mtime < ttl_sec:
+        return pd.read_parquet(p)
+    df = importlib.import_module(backend).fetch_backlog_df()
+    p.parent.mkdir(exist_ok=True)
+    df.to_parquet(p)
+    return df
+
+
+@st.cache_resource(show_spinner=True)
+def _fetch_df(backend: str):
+    """Raw Snowflake frame, shared (not copied) across reruns – treat as read-only."""
+    return _fetch_cached(backend)
+
+
+@st.cache_data(show_spinner=False)
+def _build_views(_df, df_id, backend: str):
+    """Derived views keyed on the identity of the cached raw frame."""
+    return importlib.import_module(backend).build_backlog_views(_df)
+
+
+def _view(views, key: str):
+    """views[key] for dict-returning backends; attribute access for the root BacklogViews."""
+    return getattr(views, key) if hasattr(views, "_fields") else views[key]
+
+
+def _rows_in_scope(views) -> int:
+    return views.rows_in_scope if hasattr(views, "_fields") else len(views["allWOs"])
+
+
+def load_data_from_snowflake(backend: str) -> Tuple[pd.DataFrame, Any]:
+    """Render the refresh button, then return (df, views) for the given backend module."""
+    if st.button("Load / Refresh data from Snowflake"):
+        _fetch_df.clear()
+        _build_views.clear()
+        _parquet_path(backend).unlink(missing_ok=True)
+
+    df = _fetch_df(backend)
+    views = _build_views(df, id(df), backend)
+
+    st.success("Snowflake data loaded.")
+    st.caption(
+        f"{len(df):,} rows returned from Snowflake; "
+        f"{_rows_in_scope(views):,} PROSERV WOs in scope."
+    )
+    return df, views
+
+
+# -------------------------------------------------
+# 2. Sidebar – model parameters
+# -------------------------------------------------
+
+class SimParams(NamedTuple):
+    tw_headcount: int
+    q2_headcount: int
+    utilization: float
+    qtr_demand_total: float
+    tw_share_of_demand: float
+    tw_capacity_reduction_month: int
+    model_diff_demand_after_removal: bool
+    post_removal_qtr_demand_total: Optional[float]
+    modify_demand_after_12_months: bool
+    post_12_qtr_demand_total: Optional[float]
+    months: int
+    removal_threshold_months: float
+
+    def model_kwargs(self, views: dict) -> dict:
+        """run_tailwind_model keyword arguments for these params and the loaded views."""
+        kwargs = self._asdict()
+        # Backends without the 12-month demand switch don't accept these keywords
+        if not self.modify_demand_after_12_months:
+            del kwargs["modify_demand_after_12_months"], kwargs["post_12_qtr_demand_total"]
+        kwargs.update(
+            total_backlog=_view(views, "total_backlog"),
+            total_TW_backlog=_view(views, "total_TW_backlog"),
+            tw_shift_map=_view(views, "tw_shift_map"),
+        )
+        return kwargs
+
+
+def render_sidebar_params(views: dict, allow_post_12_demand: bool = True) -> SimParams:
+    """Draw the summary + model parameter widgets and return their values."""
+    total_backlog = _view(views, "total_backlog")
+    total_TW_backlog = _view(views, "total_TW_backlog")
+
+    st.sidebar.markdown("### Summary")
+    st.sidebar.markdown(
+        f"""
+        **Total Backlog:** <span style="color:#58771e;"><i>{total_backlog:,.0f}  hrs</i></span>  
+        **Tailwind Backlog:** <span style="color:#d1bd19;"><i>{total_TW_backlog:,.0f}  hrs</i></span>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.sidebar.header("Model Parameters")
+
+    st.sidebar.markdown("### Capacity")
+    tw_headcount = st.sidebar.number_input("Tailwind Headcount", min_value=0, value=6, step=1)
+    q2_headcount = st.sidebar.number_input("Q2 Headcount", min_value=0, value=2, step=1)
+    utilization = st.sidebar.number_input(
+        "Utilization %", min_value=0.0, value=0.78, step=0.01
+    )
+
+    st.sidebar.markdown("### Demand")
+    qtr_demand_total = st.sidebar.number_input(
+        "Quarterly Demand (hours)", min_value=0.0, value=1440.0, step=50.0
+    )
+    tw_share_of_demand = st.sidebar.slider(
+        "Tailwind Share of Demand", min_value=0.0, max_value=1.0, value=0.0, step=0.05
+    )
+
+    # Month (1-based) when Tailwind capacity is reduced by 50%. Use 0 for "never".
+    tw_capacity_reduction_month = st.sidebar.number_input(
+        "Tailwind Capacity Reduction Month (50%)",
+        min_value=0,
+        value=0,
+        step=1,
+        help="If set to N>0, Tailwind capacity will be cut in half starting in month N."
+    )
+
+    model_diff_demand_after_removal = st.sidebar.checkbox(
+        "Model different incoming demand after Tailwind removal?",
+        value=False
+    )
+    post_removal_qtr_demand_total = None
+    if model_diff_demand_after_removal:
+        post_removal_qtr_demand_total = st.sidebar.number_input(
+            "Quarterly Demand After Tailwind Removal (hours)",
+            min_value=0.0,
+            value=float(qtr_demand_total),
+            step=50.0,
+            help="Used to compute monthly incoming demand starting in the Tailwind removal threshold month."
+        )
+
+    modify_demand_after_12_months = False
+    post_12_qtr_demand_total = None
+    if allow_post_12_demand:
+        modify_demand_after_12_months = st.sidebar.checkbox(
+            "Modify incoming demand after 12 months?",
+            value=False
+        )
+        if modify_demand_after_12_months:
+            post_12_qtr_demand_total = st.sidebar.number_input(
+                "Quarterly Demand After 12 Months (hours)",
+                min_value=0.0,
+                value=float(qtr_demand_total),
+                step=50.0,
+                help="Used to compute monthly incoming demand starting in month 13, until Tailwind removal (if applicable)."
+            )
+
+    st.sidebar.markdown("### Output Preferences")
+    months = st.sidebar.number_input("Simulation Horizon (months)", min_value=1, value=28, step=1)
+    removal_threshold_months = st.sidebar.number_input(
+        "Tailwind Removal Threshold (backlog months, at full capacity)",
+        min_value=0.0,
+        value=4.0,
+        step=0.5
+    )
+
+    return SimParams(
+        tw_headcount=tw_headcount,
+        q2_headcount=q2_headcount,
+        utilization=utilization,
+        qtr_demand_total=qtr_demand_total,
+        tw_share_of_demand=tw_share_of_demand,
+        tw_capacity_reduction_month=tw_capacity_reduction_month,
+        model_diff_demand_after_removal=model_diff_demand_after_removal,
+        post_removal_qtr_demand_total=post_removal_qtr_demand_total,
+        modify_demand_after_12_months=modify_demand_after_12_months,
+        post_12_qtr_demand_total=post_12_qtr_demand_total,
+        months=months,
+        removal_threshold_months=removal_threshold_months,
+    )
+
+
+# -------------------------------------------------
+# 3. Run model + charts (cached across reruns)
+# -------------------------------------------------
+
+@st.cache_data(show_spinner=False)
+def _cached_run_model(backend: str, **kwargs):
+    """Memoize backend.run_tailwind_model on its (small, scalar) parameter set."""
+    return importlib.import_module(backend).run_tailwind_model(**kwargs)
+
+
+def add_labels(ax, x, y, step=1, fmt="{:,.0f}", y_offset=0, style="text"):
+    """Value labels on every step-th point.
+
+    style="text": plain ax.text just above each point.
+    style="annotate": offset annotations that stop once the line reaches zero.
+    """
+    if style == "text":
+        for i, (xx, yy) in enumerate(zip(x, y)):
+            if i % step == 0:
+                ax.text(xx, yy, fmt.format(yy), fontsize=8, ha='center', va='bottom')
+        return
+
+    xv = np.asarray(x)[::step]
+    yv = np.asarray(y)[::step]
+    # Stop labeling once the line reaches zero or below
+    nonpos = np.flatnonzero(yv <= 0)
+    if nonpos.size:
+        xv, yv = xv[:nonpos[0]], yv[:nonpos[0]]
+
+    ann = ax.annotate
+    for xi, val in zip(xv.tolist(), yv.tolist()):
+        ann(
+            fmt.format(val),
+            (xi, val),
+            textcoords="offset points",
+            xytext=(0, y_offset),
+            ha="center",
+            fontsize=9,
+        )
+
+
+_PLOT_COLS = ["Month", "Total_Backlog", "TW_Backlog", "Q2_Backlog", "Backlog_Months"]
+
+# Rendered charts kept per distinct model output; older ones are evicted
+_FIG_CACHE_ENTRIES = 16
+
+
+def _df_signature(df) -> int:
+    """Content hash of the plotted model columns, used as the chart cache key."""
+    return hash(df[_PLOT_COLS].to_numpy(dtype=float).tobytes())
+
+
+def _fig_to_png(fig: Figure) -> bytes:
+    """`fig` rendered to PNG the way st.pyplot renders it."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=_FIG_CACHE_ENTRIES)
+def _fig1_png(_df_reduced, df_sig, palette3, style, label_style) -> bytes:
+    """Backlog burndown (hours) chart as PNG bytes, rendered once per (model output, options)."""
+    with plt.style.context(style):
+        return _fig_to_png(_build_fig1(_df_reduced, palette3, label_style))
+
+
+@st.cache_data(show_spinner=False, max_entries=_FIG_CACHE_ENTRIES)
+def _fig2_png(_df_reduced, df_sig, palette3, style, label_style, axis_limits) -> bytes:
+    """Backlog-in-months chart as PNG bytes, rendered once per (model output, options)."""
+    with plt.style.context(style):
+        return _fig_to_png(_build_fig2(_df_reduced, palette3, label_style, axis_limits))
+
+
+def _build_fig1(df_reduced, palette3, label_style) -> Figure:
+    """Backlog burndown (hours) figure; draw under the style context."""
+    # Plain Figure (not plt.subplots): not kept alive by pyplot's figure registry
+    fig1 = Figure(figsize=(10, 5))
+    ax1 = fig1.subplots()
+
+    months = df_reduced["Month"].to_numpy()
+    ys = df_reduced[["Total_Backlog", "TW_Backlog", "Q2_Backlog"]].to_numpy()
+
+    lines = ax1.plot(months, ys, marker='o')
+    for line, lbl, c in zip(lines, ["Total Backlog", "Tailwind Backlog", "Q2 Backlog"], palette3 or [None] * 3):
+        line.set_label(lbl)
+        if c:
+            line.set_color(c)
+
+    # Labels: above / below / above the line
+    for col, y_offset in enumerate((8, -10, 8)):
+        add_labels(ax1, months, ys[:, col], step=3, y_offset=y_offset, style=label_style)
+
+    ax1.set_xlabel("Month")
+    ax1.set_ylabel("Backlog (Hours)")
+    ax1.set_title("Backlog Burndown – Tailwind Removed at Backlog Threshold")
+    ax1.legend()
+    ax1.grid(True)
+    return fig1
+
+
+def _build_fig2(df_reduced, palette3, label_style, axis_limits) -> Figure:
+    """Backlog-in-months figure; draw under the style context."""
+    fig2 = Figure(figsize=(10, 5))
+    ax2 = fig2.subplots()
+    ax2.plot(
+        df_reduced["Month"],
+        df_reduced["Backlog_Months"],
+        marker="o",
+        label="Backlog (Months)",
+        color=(palette3[0] if palette3 else None),
+    )
+
+    add_labels(
+        ax2,
+        df_reduced["Month"],
+        df_reduced["Backlog_Months"],
+        step=3,
+        y_offset=8,
+        fmt="{:.1f}",
+        style=label_style,
+    )
+
+    ax2.set_xlabel("Month")
+    ax2.set_ylabel("Backlog (Months)")
+    ax2.set_title("Backlog in Months – Tailwind Removed at Backlog Threshold")
+
+    # ---- added axis control ----
+    if axis_limits:
+        ax2.set_xlim(0, 30)
+        ax2.set_ylim(0, 15)
+        ax2.set_yticks(range(0, 16, 3))
+    # ----------------------------
+
+    ax2.legend()
+    ax2.grid(True)
+    return fig2
+
+
+@st.fragment
+def run_and_plot(
+    params: SimParams,
+    views: dict,
+    backend: str,
+    palette: Optional[list] = None,
+    style: str = "classic",
+    label_style: str = "text",
+    months_axis_limits: bool = False,
+):
+    """Run button + results; clicking Run reruns only this block, not the whole app."""
+    if not st.button("Run Burndown Simulation"):
+        st.info("Adjust parameters on the left and click 'Run Burndown Simulation'.")
+        return
+
+    df_reduced = _cached_run_model(backend, **params.model_kwargs(views))
+
+    st.subheader("Burndown Results (Tailwind Removed at Backlog Threshold)")
+    st.dataframe(df_reduced)
+
+    df_sig = _df_signature(df_reduced)
+    palette_key = tuple(palette) if palette else None
+
+    # 1) Backlog burndown – hours
+    st.image(_fig1_png(df_reduced, df_sig, palette_key, style, label_style))
+
+    # 2) Backlog in months
+    st.image(_fig2_png(df_reduced, df_sig, palette_key, style, label_style, months_axis_limits))
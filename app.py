@@ -1,15 +1,25 @@
 # app.py
 
 import streamlit as st
+import matplotlib
+matplotlib.use("Agg")  # non-GUI backend; Streamlit only needs rendered images
+matplotlib.rcParams["path.simplify"] = True
+matplotlib.rcParams["path.simplify_threshold"] = 1.0
 import matplotlib.pyplot as plt
+import matplotlib.ticker as ticker
+from matplotlib.figure import Figure
+import numpy as np
 import pandas as pd
+import io
 import os
 from datetime import datetime
 
 from backlog_burndown import (
-    fetch_backlog_df,
+    VIEW_COLUMNS,
+    fetch_backlog_df_cached,
     build_backlog_views,
     run_tailwind_model,
+    to_excel_fast,
 )
 
 st.set_page_config(page_title="Backlog Burndown (Q2 + Tailwind)", layout="wide")
@@ -20,31 +30,37 @@ st.title("Backlog Burndown Simulator (Q2 + Tailwind, Live Snowflake Data)")
 # 1. Load data from Snowflake (cached)
 # -------------------------------------------------
 
-@st.cache_data(show_spinner=True)
-def load_data_from_snowflake():
-    df = fetch_backlog_df()
+# cache_resource hands back the same objects on every rerun (no pickle round
+# trip); treat df/views as read-only below.
+@st.cache_resource(show_spinner=True)
+def load_data_from_snowflake(_force_refresh: bool = False):
+    # Leading underscore: Streamlit doesn't hash it, so a forced refresh
+    # repopulates the same cache entry the normal loads read from.
+    df = fetch_backlog_df_cached(
+        ttl_minutes=60, force_refresh=_force_refresh, columns=VIEW_COLUMNS
+    )
     views = build_backlog_views(df)
     return df, views
 
-if st.button("Load / Refresh data from Snowflake"):
-    st.cache_data.clear()
+force_refresh = st.button("Load / Refresh data from Snowflake")
+if force_refresh:
+    load_data_from_snowflake.clear()
 
-df, views = load_data_from_snowflake()
+df, views = load_data_from_snowflake(_force_refresh=force_refresh)
 
 st.success("Snowflake data loaded.")
 st.caption(
     f"{len(df):,} rows returned from Snowflake; "
-    f"{len(views['allWOs']):,} PROSERV WOs in scope."
+    f"{views.rows_in_scope:,} PROSERV WOs in scope."
 )
 
 # Unpack views
-allWOs = views["allWOs"]
-allTWWOs = views["allTWWOs"]
-total_backlog = views["total_backlog"]
-total_TW_backlog = views["total_TW_backlog"]
-total_NANC_backlog = float(views["allNANCWOs"]["Allocated_Hours"].sum() - views["allNANCWOs"]["Hours_Logged"].sum())
-total_AC_backlog = float(views["total_backlog"]-views["total_TW_backlog"]-total_NANC_backlog)
-tw_shift_map = views["tw_shift_map"]
+total_backlog = views.total_backlog
+total_TW_backlog = views.total_TW_backlog
+total_NANC_backlog = views.total_NANC_backlog
+total_AC_backlog = views.total_AC_backlog
+tw_shift_map = views.tw_shift_map
+shift_arr = views.shift_arr
 
 # -------------------------------------------------
 # 2. Sidebar – model parameters
@@ -134,7 +150,122 @@ if model_diff_demand_after_removal:
 
 st.sidebar.markdown("### Output Preferences")
 months = st.sidebar.number_input("Simulation Horizon (months)", min_value=1, value=28, step=1)
+write_xlsx = st.sidebar.checkbox(
+    "Also write xlsx exports (slow)",
+    value=False,
+    help="Work order exports are always written as Parquet; tick to also write Excel copies."
+)
+
+
+
+# -------------------------------------------------
+# Output helpers
+# -------------------------------------------------
 
+def write_bytes(path: str, data: bytes):
+    """One buffered write per file (output_dir is on OneDrive; fewer syscalls)."""
+    with open(path, "wb", buffering=1 << 20) as f:
+        f.write(data)
+
+
+# -------------------------------------------------
+# Charts (cached per model output)
+# -------------------------------------------------
+
+def add_labels(ax, x, y, step=1, fmt="{:,.0f}", y_offset=0):
+    xv = np.asarray(x)[::step]
+    yv = np.asarray(y, dtype=float)[::step]
+    # Stop labeling once the line reaches zero or below
+    nonpos = np.flatnonzero(yv <= 0)
+    if nonpos.size:
+        xv, yv = xv[:nonpos[0]], yv[:nonpos[0]]
+
+    for xi, val in zip(xv.tolist(), yv.tolist()):
+        ax.annotate(
+            fmt.format(val),
+            (xi, val),
+            textcoords="offset points",
+            xytext=(0, y_offset),
+            ha="center",
+            fontsize=9,
+        )
+
+
+# The one PNG rendered per chart: shown on screen and persisted per run
+PNG_SAVE_KW = {"dpi": 150, "bbox_inches": "tight", "pil_kwargs": {"optimize": True}}
+
+_PLOT_COLS = ["Month", "Total_Backlog", "TW_Backlog", "NANC_Backlog", "AC_Backlog", "Backlog_Months"]
+
+# Rendered charts kept per distinct model output; older ones are evicted
+_FIG_CACHE_ENTRIES = 16
+
+
+def df_signature(df: pd.DataFrame) -> int:
+    """Content hash of the plotted model columns, used as the chart cache key."""
+    return hash(df[_PLOT_COLS].to_numpy(dtype=float).tobytes())
+
+
+def fig_to_png(fig: Figure) -> bytes:
+    """`fig` rendered to PNG with PNG_SAVE_KW."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", **PNG_SAVE_KW)
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=_FIG_CACHE_ENTRIES)
+def build_hours_png(_df_reduced: pd.DataFrame, df_sig: int) -> bytes:
+    """Backlog burndown (hours) chart as PNG bytes, rendered once per model output."""
+    with plt.style.context("classic"):
+        return fig_to_png(_hours_fig(_df_reduced))
+
+
+def _hours_fig(df_reduced: pd.DataFrame) -> Figure:
+    """Backlog burndown (hours) figure; draw under the style context."""
+    # Plain Figure (not plt.subplots): not kept alive by pyplot's figure registry
+    fig1 = Figure(figsize=(10, 5))
+    ax1 = fig1.subplots()
+    ax1.plot(df_reduced["Month"], df_reduced["Total_Backlog"], marker="o", label="Total Backlog")
+    ax1.plot(df_reduced["Month"], df_reduced["TW_Backlog"], marker="o", label="Tailwind Backlog")
+    ax1.plot(df_reduced["Month"], df_reduced["NANC_Backlog"], marker="o", label="Non-Actionable")
+    ax1.plot(df_reduced["Month"], df_reduced["AC_Backlog"], marker="o", label="Actionable (Q2)")
+
+    add_labels(ax1, df_reduced["Month"], df_reduced["Total_Backlog"], step=3, y_offset=8)
+    add_labels(ax1, df_reduced["Month"], df_reduced["TW_Backlog"], step=3, y_offset=-10)
+    add_labels(ax1, df_reduced["Month"], df_reduced["NANC_Backlog"], step=3, y_offset=8)
+    add_labels(ax1, df_reduced["Month"], df_reduced["AC_Backlog"], step=3, y_offset=8)
+
+    ax1.set_xlabel("Month")
+    ax1.set_ylabel("Backlog (Hours)")
+    ax1.yaxis.set_major_formatter(ticker.StrMethodFormatter("{x:,.0f}"))
+    ax1.set_title("Backlog Burndown – Tailwind Removed at Backlog Threshold")
+    ax1.legend()
+    ax1.grid(True)
+    return fig1
+
+
+@st.cache_data(show_spinner=False, max_entries=_FIG_CACHE_ENTRIES)
+def build_months_png(_df_reduced: pd.DataFrame, df_sig: int) -> bytes:
+    """Backlog-in-months chart as PNG bytes, rendered once per model output."""
+    with plt.style.context("classic"):
+        return fig_to_png(_months_fig(_df_reduced))
+
+
+def _months_fig(df_reduced: pd.DataFrame) -> Figure:
+    """Backlog-in-months figure; draw under the style context."""
+    fig2 = Figure(figsize=(10, 5))
+    ax2 = fig2.subplots()
+    ax2.plot(df_reduced["Month"], df_reduced["Backlog_Months"], marker="o", label="Backlog (Months)")
+    add_labels(ax2, df_reduced["Month"], df_reduced["Backlog_Months"], step=2, y_offset=8, fmt="{:.1f}")
+
+    ax2.set_xlabel("Month")
+    ax2.set_ylabel("Backlog (Months)")
+    ax2.set_title("Backlog in Months – Tailwind Removed at Backlog Threshold")
+    ax2.set_xlim(0, 30)
+    ax2.set_ylim(0, 15)
+    ax2.set_yticks(range(0, 16, 2))
+    ax2.legend()
+    ax2.grid(True)
+    return fig2
 
 
 # -------------------------------------------------
@@ -152,7 +283,7 @@ if st.button("Run Burndown Simulation"):
         qtr_demand_total=qtr_demand_total,
         tw_share_of_demand=tw_share_of_demand,
         months=months,
-        tw_shift_map=tw_shift_map,
+        tw_shift_map=shift_arr,
         removal_threshold_months=removal_threshold_months,
         tw_capacity_reduction_month=tw_capacity_reduction_month,
         model_diff_demand_after_removal=model_diff_demand_after_removal,
@@ -212,104 +343,66 @@ if st.button("Run Burndown Simulation"):
     Actionable Backlog (hrs): {total_AC_backlog:,.0f}
     """
 
-    with open(params_txt_path, "w", encoding="utf-8") as f:
-        f.write(params_text.strip())
+    write_bytes(params_txt_path, params_text.strip().encode("utf-8"))
 
     st.success(f"Saved model parameters to: {params_txt_path}")
 
     # Save the main results table
-    df_reduced.to_csv(
+    write_bytes(
         os.path.join(output_dir, f"burndown_results_{run_id}.csv"),
-        index=False
+        df_reduced.to_csv(index=False).encode("utf-8"),
     )
 
     st.subheader("Burndown Results (Tailwind Removed at Backlog Threshold)")
     st.dataframe(df_reduced)
 
-    plt.style.use("classic")
-
-    def add_labels(ax, x, y, step=1, fmt="{:,.0f}", y_offset=0):
-        for i in range(0, len(x), step):
-            val = y.iloc[i] if hasattr(y, "iloc") else y[i]
-            if val <= 0:
-                break
-            ax.annotate(
-                fmt.format(val),
-                (x.iloc[i] if hasattr(x, "iloc") else x[i], val),
-                textcoords="offset points",
-                xytext=(0, y_offset),
-                ha="center",
-                fontsize=9,
-            )
+    df_sig = df_signature(df_reduced)
 
     # 1) Backlog burndown – hours
-    fig1, ax1 = plt.subplots(figsize=(10, 5))
-    ax1.plot(df_reduced["Month"], df_reduced["Total_Backlog"], marker="o", label="Total Backlog")
-    ax1.plot(df_reduced["Month"], df_reduced["TW_Backlog"], marker="o", label="Tailwind Backlog")
-    ax1.plot(df_reduced["Month"], df_reduced["NANC_Backlog"], marker="o", label="Non-Actionable")
-    ax1.plot(df_reduced["Month"], df_reduced["AC_Backlog"], marker="o", label="Actionable (Q2)")
-
-    add_labels(ax1, df_reduced["Month"], df_reduced["Total_Backlog"], step=3, y_offset=8)
-    add_labels(ax1, df_reduced["Month"], df_reduced["TW_Backlog"], step=3, y_offset=-10)
-    add_labels(ax1, df_reduced["Month"], df_reduced["NANC_Backlog"], step=3, y_offset=8)
-    add_labels(ax1, df_reduced["Month"], df_reduced["AC_Backlog"], step=3, y_offset=8)
-
-    import matplotlib.ticker as ticker
-    ax1.set_xlabel("Month")
-    ax1.set_ylabel("Backlog (Hours)")
-    ax1.yaxis.set_major_formatter(ticker.StrMethodFormatter("{x:,.0f}"))
-    ax1.set_title("Backlog Burndown – Tailwind Removed at Backlog Threshold")
-    ax1.legend()
-    ax1.grid(True)
-
-    st.pyplot(fig1)
-    fig1.savefig(os.path.join(output_dir, f"backlog_burndown_hours_{run_id}.png"), dpi=200, bbox_inches="tight")
+    png1 = build_hours_png(df_reduced, df_sig)
+    st.image(png1)
+    write_bytes(os.path.join(output_dir, f"backlog_burndown_hours_{run_id}.png"), png1)
 
     # 2) Backlog in months
-    fig2, ax2 = plt.subplots(figsize=(10, 5))
-    ax2.plot(df_reduced["Month"], df_reduced["Backlog_Months"], marker="o", label="Backlog (Months)")
-    add_labels(ax2, df_reduced["Month"], df_reduced["Backlog_Months"], step=2, y_offset=8, fmt="{:.1f}")
-
-    ax2.set_xlabel("Month")
-    ax2.set_ylabel("Backlog (Months)")
-    ax2.set_title("Backlog in Months – Tailwind Removed at Backlog Threshold")
-    ax2.set_xlim(0, 30)
-    ax2.set_ylim(0, 15)
-    ax2.set_yticks(range(0, 16, 2))
-    ax2.legend()
-    ax2.grid(True)
-
-    st.pyplot(fig2)
-    fig2.savefig(os.path.join(output_dir, f"backlog_burndown_months_{run_id}.png"), dpi=200, bbox_inches="tight")
+    png2 = build_months_png(df_reduced, df_sig)
+    st.image(png2)
+    write_bytes(os.path.join(output_dir, f"backlog_burndown_months_{run_id}.png"), png2)
 
     st.success(f"Saved outputs to: {output_dir}")
 
     # -------------------------------------------------
-    # 3b. Export NANC work orders to Excel (OneDrive root)
+    # 3b. Export NANC work orders (Parquet; Excel on request)
     # -------------------------------------------------
     nanc_base_dir = output_dir
     nanc_run_id = f"NANC_WorkShift_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    nanc_path = os.path.join(nanc_base_dir, f"{nanc_run_id}.xlsx")
-    views = build_backlog_views(df)
-    # views must be in scope; this expects you already have `views = build_backlog_views(df)`
-    nanc_df = views.get("nanc_export")
+    nanc_path = os.path.join(nanc_base_dir, f"{nanc_run_id}.parquet")
+    # `views` comes from load_data_from_snowflake() (rebuilt on every refresh)
+    nanc_df = views.nanc_export
     if nanc_df is not None and len(nanc_df) > 0:
-        nanc_df.to_excel(nanc_path, index=False)
+        nanc_df.to_parquet(nanc_path, index=False, compression="zstd")
         st.success(f"Saved NANC work orders to: {nanc_path}")
+        if write_xlsx:
+            nanc_xlsx_path = nanc_path.replace(".parquet", ".xlsx")
+            to_excel_fast(nanc_df, nanc_xlsx_path)
+            st.success(f"Saved NANC work orders to: {nanc_xlsx_path}")
     else:
         st.info("No NANC work orders found to export.")
 
     # -------------------------------------------------
-    # 3c. Export ALL work orders to Excel (OneDrive root)
+    # 3c. Export ALL work orders (Parquet; Excel on request)
     # -------------------------------------------------
     allwo_base_dir = output_dir
     allwo_run_id = f"AllWorkOrders_WorkShift_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    allwo_path = os.path.join(allwo_base_dir, f"{allwo_run_id}.xlsx")
+    allwo_path = os.path.join(allwo_base_dir, f"{allwo_run_id}.parquet")
 
-    allwo_df = views.get("allwo_export")
+    allwo_df = views.allwo_export
     if allwo_df is not None and len(allwo_df) > 0:
-        allwo_df.to_excel(allwo_path, index=False)
+        allwo_df.to_parquet(allwo_path, index=False, compression="zstd")
         st.success(f"Saved ALL work orders export to: {allwo_path}")
+        if write_xlsx:
+            allwo_xlsx_path = allwo_path.replace(".parquet", ".xlsx")
+            to_excel_fast(allwo_df, allwo_xlsx_path)
+            st.success(f"Saved ALL work orders export to: {allwo_xlsx_path}")
     else:
         st.info("No work orders found to export in allwo_export.")
 
@@ -325,15 +418,15 @@ if st.button("Run Burndown Simulation"):
         ]
         shift_df = pd.DataFrame(shift_rows)
 
-        pd.DataFrame(shift_rows).to_csv(
-            os.path.join(output_dir, f"shift_schedule_full_{run_id}.csv"),
-            index=False
-        )
-
-        shift_df.to_csv(
-            os.path.join(output_dir, f"shift_schedule_displayed_{run_id}.csv"),
-            index=False
-        )
+        # Full and displayed schedules are the same table: serialize once
+        shift_csv = shift_df.to_csv(index=False).encode("utf-8")
+        full_path = os.path.join(output_dir, f"shift_schedule_full_{run_id}.csv")
+        displayed_path = os.path.join(output_dir, f"shift_schedule_displayed_{run_id}.csv")
+        write_bytes(full_path, shift_csv)
+        try:
+            os.link(full_path, displayed_path)  # hardlink: no second upload
+        except OSError:
+            write_bytes(displayed_path, shift_csv)
 
         st.dataframe(shift_df, use_container_width=True, hide_index=True)
     else:
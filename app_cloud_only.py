@@ -5,7 +5,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import streamlit as st
 
-from backlog_burndown import build_backlog_views, run_tailwind_model
+from backlog_burndown import BacklogViews, build_backlog_views, run_tailwind_model, to_excel_fast
 
 st.set_page_config(page_title="Backlog Burndown (Q2 + Tailwind)", layout="wide")
 st.title("Backlog Burndown Simulator (Q2 + Tailwind)")
@@ -36,6 +36,11 @@ def load_df(file_bytes: bytes, filename: str) -> pd.DataFrame:
         return pd.read_csv(io.BytesIO(file_bytes))
     return pd.read_excel(io.BytesIO(file_bytes))
 
+@st.cache_data(show_spinner=False)
+def load_views(file_bytes: bytes, filename: str) -> BacklogViews:
+    # Keyed on the same upload as load_df, so sidebar tweaks don't rebuild views
+    return build_backlog_views(load_df(file_bytes, filename))
+
 df_bytes = uploaded_file.getvalue()
 df = load_df(df_bytes, uploaded_file.name)
 
@@ -65,17 +70,16 @@ if missing:
     )
     st.stop()
 
-# Build views from uploaded data
-views = build_backlog_views(df)
+# Build views from uploaded data (cached per upload)
+views = load_views(df_bytes, uploaded_file.name)
 
 # Unpack views
-total_backlog = views["total_backlog"]
-total_TW_backlog = views["total_TW_backlog"]
-total_NANC_backlog = float(
-    views["allNANCWOs"]["Allocated_Hours"].sum() - views["allNANCWOs"]["Hours_Logged"].sum()
-)
-total_AC_backlog = float(total_backlog - total_TW_backlog - total_NANC_backlog)
-tw_shift_map = views["tw_shift_map"]
+total_backlog = views.total_backlog
+total_TW_backlog = views.total_TW_backlog
+total_NANC_backlog = views.total_NANC_backlog
+total_AC_backlog = views.total_AC_backlog
+tw_shift_map = views.tw_shift_map
+shift_arr = views.shift_arr
 
 # -------------------------------------------------
 # 2. Sidebar – model parameters
@@ -201,7 +205,7 @@ if st.button("Run Burndown Simulation"):
         qtr_demand_total=qtr_demand_total,
         tw_share_of_demand=tw_share_of_demand,
         months=months,
-        tw_shift_map=tw_shift_map,
+        tw_shift_map=shift_arr,
         removal_threshold_months=removal_threshold_months,
         tw_capacity_reduction_month=tw_capacity_reduction_month,
         model_diff_demand_after_removal=model_diff_demand_after_removal,
@@ -349,11 +353,10 @@ Actionable Backlog (hrs): {total_AC_backlog:,.0f}
     # -------------------------------------------------
     # 3c. Excel exports (in-memory)
     # -------------------------------------------------
-    nanc_df = views.get("nanc_export")
+    nanc_df = views.nanc_export
     if nanc_df is not None and len(nanc_df) > 0:
         nanc_xlsx = io.BytesIO()
-        with pd.ExcelWriter(nanc_xlsx, engine="openpyxl") as writer:
-            nanc_df.to_excel(writer, index=False, sheet_name="NANC")
+        to_excel_fast(nanc_df, nanc_xlsx, sheet_name="NANC")
         nanc_xlsx.seek(0)
 
         st.download_button(
@@ -365,11 +368,10 @@ Actionable Backlog (hrs): {total_AC_backlog:,.0f}
     else:
         st.info("No NANC work orders found to export.")
 
-    allwo_df = views.get("allwo_export")
+    allwo_df = views.allwo_export
     if allwo_df is not None and len(allwo_df) > 0:
         allwo_xlsx = io.BytesIO()
-        with pd.ExcelWriter(allwo_xlsx, engine="openpyxl") as writer:
-            allwo_df.to_excel(writer, index=False, sheet_name="All_Work_Orders")
+        to_excel_fast(allwo_df, allwo_xlsx, sheet_name="All_Work_Orders")
         allwo_xlsx.seek(0)
 
         st.download_button(
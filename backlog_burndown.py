@@ -1,47 +1,90 @@
 # backlog_burndown.py
 
+import hashlib
+import os
+import time
+from typing import NamedTuple
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import snowflake.connector
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
 # ------------------------------------------------------------------
 # 1. SNOWFLAKE QUERY + DATA LOAD
 # ------------------------------------------------------------------
 
+# Session-scoped temp tables for the Mavenlink workspace/resource tables, so
+# each is scanned a single time per pull (_ml_ws is referenced twice), plus
+# pre-normalized WO join keys so ws_to_wo joins on plain columns and a
+# two-column Mavenlink user lookup for the final SELECT.
+BURNDOWN_TEMP_SQL = """
+CREATE OR REPLACE TEMPORARY TABLE _ml_ws AS
+SELECT
+    w.ID::STRING                                AS workspace_id,
+    NULLIF(TRIM(w.CUSTOM_WORK_ORDER_ID), '')    AS custom_work_order_id,
+    NULLIF(TRIM(w.CUSTOM_WORK_ORDER), '')       AS custom_work_order,
+    NULLIF(TRIM(w.CUSTOM_PROJECT_SUB_TYPE), '') AS custom_project_sub_type,
+    /* normalized join keys for ws_to_wo */
+    UPPER(NULLIF(TRIM(w.CUSTOM_WORK_ORDER_ID), '')) AS cwo_id_key,
+    UPPER(NULLIF(TRIM(w.CUSTOM_WORK_ORDER), ''))    AS cwo_name_key
+FROM Q2_ODS.MAVENLINK.WORKSPACE w;
+
+CREATE OR REPLACE TEMPORARY TABLE _wo_keys AS
+SELECT
+    wo.ID::STRING              AS wo_id,
+    wo.NAME                    AS wo_code,
+    UPPER(TRIM(wo.ID::STRING)) AS id_key,
+    UPPER(TRIM(wo.NAME))       AS name_key
+FROM Q2_ODS.SALESFORCE.WORK_ORDER_C wo;
+
+CREATE OR REPLACE TEMPORARY TABLE _wr AS
+SELECT
+    wr.ID,
+    wr.WORKSPACE_ID,
+    wr.USER_ID,
+    wr.ROLE_NAME,
+    wr.UPDATED_AT
+FROM Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE wr;
+
+CREATE OR REPLACE TEMPORARY TABLE _mu AS
+SELECT u.ID, u.FULL_NAME
+FROM Q2_ODS.MAVENLINK.USER u;
+"""
+
 BURNDOWN_SQL = """
 WITH
-/* ---------- Mavenlink workspaces ---------- */
+/* ---------- Mavenlink workspaces (temp table) ---------- */
 ml_workspace AS (
-  SELECT
-      w.ID::STRING                                AS workspace_id,
-      NULLIF(TRIM(w.CUSTOM_WORK_ORDER_ID), '')    AS custom_work_order_id,
-      NULLIF(TRIM(w.CUSTOM_WORK_ORDER), '')       AS custom_work_order,
-      NULLIF(TRIM(w.CUSTOM_PROJECT_SUB_TYPE), '') AS custom_project_sub_type
-  FROM Q2_ODS.MAVENLINK.WORKSPACE w
+  SELECT * FROM _ml_ws
 ),
 
 /* ---------- Map workspace -> Salesforce WO (ID first, fallback name), de-dup ---------- */
-ws_map_id AS (
-  SELECT ms.workspace_id, wo.ID::STRING AS wo_id, wo.NAME AS wo_code, 1 AS prio
-  FROM ml_workspace ms
-  JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C wo
-    ON UPPER(TRIM(wo.ID::STRING)) = UPPER(TRIM(ms.custom_work_order_id))
-),
-ws_map_name AS (
-  SELECT ms.workspace_id, wo.ID::STRING AS wo_id, wo.NAME AS wo_code, 2 AS prio
+/* The name join only fires when there is no CWO id, so at most one side matches;
+   QUALIFY just guards against duplicate WO names. */
+ws_to_wo AS (
+  SELECT
+      ms.workspace_id,
+      COALESCE(wo_by_id.wo_id, wo_by_nm.wo_id)     AS wo_id,
+      COALESCE(wo_by_id.wo_code, wo_by_nm.wo_code) AS wo_code
   FROM ml_workspace ms
-  JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C wo
+  LEFT JOIN _wo_keys wo_by_id
+    ON wo_by_id.id_key = ms.cwo_id_key
+  LEFT JOIN _wo_keys wo_by_nm
     ON ms.custom_work_order_id IS NULL
-   AND UPPER(TRIM(wo.NAME)) = UPPER(TRIM(ms.custom_work_order))
-),
-ws_to_wo AS (
-  SELECT workspace_id, wo_id, wo_code
-  FROM (
-    SELECT m.*,
-           ROW_NUMBER() OVER (PARTITION BY m.workspace_id ORDER BY m.prio) AS rn
-    FROM (SELECT * FROM ws_map_id UNION ALL SELECT * FROM ws_map_name) m
-  ) x
-  WHERE rn = 1
+   AND wo_by_nm.name_key = ms.cwo_name_key
+  WHERE COALESCE(wo_by_id.wo_id, wo_by_nm.wo_id) IS NOT NULL
+  QUALIFY ROW_NUMBER() OVER (PARTITION BY ms.workspace_id ORDER BY COALESCE(wo_by_id.wo_id, wo_by_nm.wo_id)) = 1
 ),
 
 /* ---------- Mavenlink: aggregate once per workspace×user (COALESCE user_id -> -1) ---------- */
@@ -59,12 +102,24 @@ alloc_by_ws_user AS (
       wr.WORKSPACE_ID::STRING AS workspace_id,
       COALESCE(wr.USER_ID, -1) AS user_id_num,
       (SUM(COALESCE(wa.MINUTES,0)) / 60.0)::NUMBER(18,2) AS allocated_hours
-  FROM Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE wr
+  FROM _wr wr
   LEFT JOIN Q2_ODS.MAVENLINK.WORKSPACE_ALLOCATION wa
     ON wa.WORKSPACE_RESOURCE_ID = wr.ID
   WHERE wa._FIVETRAN_DELETED = FALSE
   GROUP BY wr.WORKSPACE_ID, COALESCE(wr.USER_ID, -1)
 ),
+/* ---------- Latest role per workspace×user (every resource row) ---------- */
+role_by_ws_user AS (
+  SELECT
+      wr.WORKSPACE_ID::STRING AS workspace_id,
+      COALESCE(wr.USER_ID, -1) AS user_id_num,
+      COALESCE(wr.ROLE_NAME,'Unassigned') AS role_name
+  FROM _wr wr
+  QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY wr.WORKSPACE_ID, wr.USER_ID
+    ORDER BY wr.UPDATED_AT DESC, wr.ID DESC
+  ) = 1
+),
 users_in_ws AS (
   SELECT workspace_id, user_id_num FROM alloc_by_ws_user
   UNION
@@ -77,49 +132,51 @@ ml_user_hours AS (
       map.wo_code,
       u.user_id_num,
       COALESCE(a.allocated_hours, 0)::NUMBER(18,2) AS allocated_hours,
-      COALESCE(t.hours_logged,    0)::NUMBER(18,2) AS hours_logged
+      COALESCE(t.hours_logged,    0)::NUMBER(18,2) AS hours_logged,
+      r.role_name
   FROM users_in_ws u
   JOIN ws_to_wo map ON map.workspace_id = u.workspace_id
   LEFT JOIN alloc_by_ws_user a
     ON a.workspace_id = u.workspace_id AND a.user_id_num = u.user_id_num
   LEFT JOIN time_by_ws_user t
     ON t.workspace_id = u.workspace_id AND t.user_id_num = u.user_id_num
+  LEFT JOIN role_by_ws_user r
+    ON r.workspace_id = u.workspace_id AND r.user_id_num = u.user_id_num
 ),
 
-/* ---------- Latest Role per workspace×user ---------- */
-wr_latest AS (
-  SELECT
-      wr.WORKSPACE_ID::STRING AS workspace_id,
-      wr.USER_ID              AS user_id_num,
-      COALESCE(wr.ROLE_NAME,'Unassigned') AS role_name
-  FROM Q2_ODS.MAVENLINK.WORKSPACE_RESOURCE wr
-  QUALIFY ROW_NUMBER() OVER (
-    PARTITION BY wr.WORKSPACE_ID, wr.USER_ID
-    ORDER BY wr.UPDATED_AT DESC, wr.ID DESC
-  ) = 1
-),
-
-/* ---------- WOLI lists per WO (IDs, Names, Count) ---------- */
-woli_lists_by_wo AS (
-  SELECT
-    woli.WORK_ORDER_C::STRING AS wo_id,
-    COUNT(DISTINCT woli.ID)   AS woli_count,
-    LISTAGG(DISTINCT woli.ID::STRING, ', ')   AS woli_ids,
-    LISTAGG(DISTINCT woli.NAME, ', ')         AS woli_names
-  FROM Q2_ODS.SALESFORCE.WORK_ORDER_LINE_ITEM_C woli
-  GROUP BY woli.WORK_ORDER_C
-),
-
-/* ---------- Distinct Product names per WO ---------- */
-products_by_wo AS (
+/* ---------- WOLI lists + product names per WO (one scan) ---------- */
+woli_agg AS (
   SELECT
     woli.WORK_ORDER_C::STRING AS wo_id,
+    /* ID is the WOLI primary key and PRODUCT_2 joins 1:1, so ids need no dedup */
+    COUNT(*)                  AS woli_count,
+    ARRAY_TO_STRING(ARRAY_AGG(woli.ID::STRING), ', ')          AS woli_ids,
+    /* hash-based ARRAY_AGG(DISTINCT) instead of LISTAGG's per-group sort+dedup */
+    ARRAY_TO_STRING(ARRAY_AGG(DISTINCT woli.NAME), ', ')       AS woli_names,
     LISTAGG(DISTINCT p2.NAME, ', ') WITHIN GROUP (ORDER BY p2.NAME) AS product_names
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_LINE_ITEM_C woli
   LEFT JOIN Q2_ODS.SALESFORCE.PRODUCT_2 p2 ON p2.ID = woli.PRODUCT_C
   GROUP BY woli.WORK_ORDER_C
 ),
 
+/* ---------- Opportunity record type id -> name ---------- */
+record_type_map AS (
+  SELECT * FROM (VALUES
+    ('0120h000000kwUeAAI', 'Q2 Gro Cross Sales Opportunity'),
+    ('0121A000000GVD3QAO', 'Helix Cross Sale Opportunity'),
+    ('0121A000000MazmQAC', 'Helix Net New Opportunity'),
+    ('0121A000000UlN6QAK', 'Centrix Cross Sales Opportunity Record Type'),
+    ('0124X000000AZVYQA4', 'Q2 Off-Platform Sales Opportunity Cross Sales'),
+    ('0124X000001yTi5QAE', 'Channel Partner Opportunity'),
+    ('0124X000001ZWN2QAO', 'PL Cross Sales Opportunity'),
+    ('012800000003bw0AAA', 'Q2 Net New Sales Opportunity'),
+    ('012800000003Z3RAAU', 'Q2 Cross Sales Opportunity Record Type'),
+    ('012C0000000Q4NyIAK', 'Renewal/Extension Opportunity Record Type'),
+    ('012C0000000Q9x0IAC', 'Amendment'),
+    ('012C0000000QFAxIAO', 'Termination Record Type')
+  ) v(rt_id, rt_name)
+),
+
 /* ---------- Salesforce WO header + Contingent WO linkage + Record Type ---------- */
 wo_base AS (
   SELECT
@@ -147,8 +204,6 @@ wo_base AS (
     wo.CREATED_DATE                       AS wo_created_date,
 
     /* Contingent / Platform WO linkage */
-    wo.PLATFORM_WO_FOR_RFA_C AS platform_wo_for_rfa_id,
-
     CASE
       WHEN wo.PLATFORM_WO_FOR_RFA_C IS NULL
            OR TRIM(wo.PLATFORM_WO_FOR_RFA_C) = ''
@@ -156,14 +211,6 @@ wo_base AS (
       ELSE pwo.NAME
     END AS contingent_wo_code,
 
-    /* Contingent start date (from contingent WO) */
-    CASE
-      WHEN wo.PLATFORM_WO_FOR_RFA_C IS NULL
-           OR TRIM(wo.PLATFORM_WO_FOR_RFA_C) = ''
-      THEN NULL
-      ELSE pwo.PROJECT_START_DATE_C
-    END AS contingent_wo_start_date,
-
     /* Contingent go-live:
        1. If contingent WO has REVISED_GO_LIVE_DATE_C, use it.
        2. Else fallback to later of (today + 6 months) OR (contingent start + 6 months).
@@ -182,27 +229,15 @@ wo_base AS (
            )
     END AS contingent_wo_go_live_date,
 
-    /* Record Type Id forced to text + inline mapping to name */
+    /* Record Type Id forced to text + name via record_type_map */
     o.RECORD_TYPE_ID::STRING              AS opportunity_record_type_id,
-    CASE o.RECORD_TYPE_ID
-      WHEN '0120h000000kwUeAAI' THEN 'Q2 Gro Cross Sales Opportunity'
-      WHEN '0121A000000GVD3QAO' THEN 'Helix Cross Sale Opportunity'
-      WHEN '0121A000000MazmQAC' THEN 'Helix Net New Opportunity'
-      WHEN '0121A000000UlN6QAK' THEN 'Centrix Cross Sales Opportunity Record Type'
-      WHEN '0124X000000AZVYQA4' THEN 'Q2 Off-Platform Sales Opportunity Cross Sales'
-      WHEN '0124X000001yTi5QAE' THEN 'Channel Partner Opportunity'
-      WHEN '0124X000001ZWN2QAO' THEN 'PL Cross Sales Opportunity'
-      WHEN '012800000003bw0AAA' THEN 'Q2 Net New Sales Opportunity'
-      WHEN '012800000003Z3RAAU' THEN 'Q2 Cross Sales Opportunity Record Type'
-      WHEN '012C0000000Q4NyIAK' THEN 'Renewal/Extension Opportunity Record Type'
-      WHEN '012C0000000Q9x0IAC' THEN 'Amendment'
-      WHEN '012C0000000QFAxIAO' THEN 'Termination Record Type'
-      ELSE 'Unknown Record Type'
-    END AS opportunity_record_type_name
+    COALESCE(rm.rt_name, 'Unknown Record Type') AS opportunity_record_type_name
 
   FROM Q2_ODS.SALESFORCE.WORK_ORDER_C wo
   LEFT JOIN Q2_ODS.SALESFORCE.OPPORTUNITY o
     ON o.ID = wo.OPPORTUNITY_C
+  LEFT JOIN record_type_map rm
+    ON rm.rt_id = o.RECORD_TYPE_ID
   LEFT JOIN Q2_ODS.SALESFORCE.WORK_ORDER_C pwo
     ON pwo.NAME = wo.PLATFORM_WO_FOR_RFA_C
 ),
@@ -257,7 +292,7 @@ SELECT
   cs_user.user_name                          AS "Configuration Specialist (SF)",
 
   /* Products & WOLIs */
-  pr.product_names                           AS "Product Name(s)",
+  wl.product_names                           AS "Product Name(s)",
   wl.woli_ids                                AS "Work Order Line Item Ids",
   wl.woli_names                              AS "Work Order Line Item Names",
   wl.woli_count                              AS "WOLI Count",
@@ -274,16 +309,12 @@ SELECT
     WHEN ml.user_id_num IS NULL       THEN '—'
     ELSE mu.FULL_NAME
   END                                      AS "Mavenlink User Name",
-  CASE
-    WHEN ml.user_id_num = -1          THEN 'Unnamed Resource'
-    WHEN ml.user_id_num IS NULL       THEN '—'
-    ELSE mu.FULL_NAME
-  END                                      AS "User Name",
+  "Mavenlink User Name"                    AS "User Name",  /* same label: reuse the alias */
   ml.user_id_num                           AS "Mavenlink User Id",
   CASE
     WHEN ml.user_id_num = -1          THEN 'Unnamed'
     WHEN ml.user_id_num IS NULL       THEN 'No ML Resource'
-    ELSE COALESCE(wr.role_name,'Unassigned')
+    ELSE COALESCE(ml.role_name,'Unassigned')
   END                                      AS "Role Name",
   COALESCE(ml.allocated_hours, 0)          AS "Allocated Hours (User×CWO)",
   COALESCE(ml.hours_logged,   0)           AS "Hours Logged (User×CWO)"
@@ -292,25 +323,91 @@ FROM wo_base wb
 LEFT JOIN ml_user_hours ml           ON ml.wo_id       = wb.wo_id
 LEFT JOIN sf_account acc             ON acc.account_id = wb.account_id
 LEFT JOIN workspace_attrs_by_wo wa   ON wa.wo_id       = wb.wo_id
-LEFT JOIN products_by_wo pr          ON pr.wo_id       = wb.wo_id
-LEFT JOIN woli_lists_by_wo wl        ON wl.wo_id       = wb.wo_id
+LEFT JOIN woli_agg wl                ON wl.wo_id       = wb.wo_id
 
 /* People lookups (SF) */
 LEFT JOIN sf_user pm                 ON pm.user_id      = wb.pm_user_id
 LEFT JOIN sf_user bc_user            ON bc_user.user_id = wb.bc_user_id
 LEFT JOIN sf_user cs_user            ON cs_user.user_id = wb.cs_user_id
 
-/* Mavenlink role + user name */
-LEFT JOIN wr_latest wr               ON wr.workspace_id = ml.workspace_id
-                                     AND wr.user_id_num = ml.user_id_num
-LEFT JOIN Q2_ODS.MAVENLINK.USER mu   ON mu.ID           = ml.user_id_num
+/* Mavenlink user name */
+LEFT JOIN _mu mu                     ON mu.ID           = ml.user_id_num
 
-ORDER BY "Account Name", "Work Order Code", "Mavenlink User Name"
+/* Only in-scope PROSERV work orders leave Snowflake */
+WHERE wb.delivery_team IN %(delivery_teams)s
+  AND (wb.project_status_sf IS NULL OR wb.project_status_sf NOT IN %(closed_statuses)s)
+  AND wa.project_sub_type = %(project_sub_type)s
 """
 
+# Applied by burndown_sql() to the outermost query, where it actually orders the result
+BURNDOWN_ORDER_BY = 'ORDER BY "Account Name", "Work Order Code", "Mavenlink User Name"'
+
+# Bind values for BURNDOWN_SQL's WHERE clause; build_backlog_views() applies the
+# same scope client-side so uploaded (unfiltered) extracts still work.
+BURNDOWN_PARAMS = {
+    "delivery_teams": ("CD - Wedge", "CD - Product SDK"),
+    "closed_statuses": ("Cancelled", "Completed", "Customer Requested Cancellation", "In Question"),
+    "project_sub_type": "PROSERV",
+}
+
+
+# Columns build_backlog_views() reads; pass as `columns` to skip converting the rest
+VIEW_COLUMNS = (
+    "Work Order Code",
+    "Account Name",
+    "Work Order Description",
+    "Project Status",
+    "Slotted Go-Live Date",
+    "Project Sub-Type",
+    "Contingent Work Order",
+    "Contingent Go-Live Date",
+    "Delivery Team",
+    "Allocated Hours (User×CWO)",
+    "Hours Logged (User×CWO)",
+)
 
-def fetch_backlog_df():
-    """Pulls the raw dataframe from Snowflake using your SQL."""
+
+def burndown_sql(columns=None) -> str:
+    """BURNDOWN_SQL, narrowed to `columns` (output names) when given.
+
+    The outer SELECT lets Snowflake prune every expression and column the
+    caller doesn't ask for; None keeps every column. Either way the result is
+    sorted by BURNDOWN_ORDER_BY on the outermost query.
+    """
+    if columns is None:
+        return f"{BURNDOWN_SQL}\n{BURNDOWN_ORDER_BY}"
+    select_list = ",\n  ".join('"' + c.replace('"', '""') + '"' for c in columns)
+    return f"SELECT\n  {select_list}\nFROM ({BURNDOWN_SQL})\n{BURNDOWN_ORDER_BY}"
+
+
+# Low-cardinality / repeated string columns: masks and groupbys work on integer
+# codes instead of strings
+CATEGORY_COLUMNS = (
+    "Delivery Team",
+    "Project Status",
+    "Project Sub-Type",
+    "Account Name",
+    "Work Order Code",
+    "Opportunity Record Type",
+    "Role Name",
+)
+
+# Work_Category labels, in code order (see build_backlog_views)
+WORK_CATEGORIES = ["Tailwind", "Non-Actionable", "Actionable"]
+
+# Hour columns as the views expose them
+RENAME_MAP = {
+    "Allocated Hours (User×CWO)": "Allocated_Hours",
+    "Hours Logged (User×CWO)": "Hours_Logged",
+}
+
+
+def fetch_backlog_table(columns=None) -> pa.Table:
+    """Pulls the raw result from Snowflake as an Arrow table (no pandas conversion).
+
+    `columns` (e.g. VIEW_COLUMNS) narrows the SELECT list via burndown_sql();
+    None pulls every column.
+    """
     conn = snowflake.connector.connect(
         account="Q2-Q2EDW",
         user="THEBNER",
@@ -322,100 +419,204 @@ def fetch_backlog_df():
     )
     cur = conn.cursor()
     try:
-        cur.execute(BURNDOWN_SQL)
-        df = cur.fetch_pandas_all()
+        conn.execute_string(BURNDOWN_TEMP_SQL)
+        cur.execute(burndown_sql(columns), BURNDOWN_PARAMS)
+        # Stream result batches and concatenate once (the SELECT list already
+        # matches `columns`, so there is nothing left to project here).
+        names = [d[0] for d in cur.description]
+        batches = list(cur.fetch_arrow_batches())
+        tbl = pa.concat_tables(batches) if batches else pa.table({n: [] for n in names})
         print("✅ Projects from Snowflake successfully pulled.")
     finally:
         cur.close()
         conn.close()
+    return tbl
+
+
+def _table_to_df(tbl: pa.Table) -> pd.DataFrame:
+    """Arrow -> pandas; self_destruct frees each Arrow column as it is converted."""
+    # Text columns (descriptions, WOLI/product lists) stay Arrow-backed strings,
+    # not Python objects; CATEGORY_COLUMNS are then dictionary-coded below.
+    # Snowflake DATE columns (date32) convert straight to datetime64 in C
+    # instead of datetime.date objects that pd.to_datetime would re-parse.
+    arrow_str = pd.StringDtype("pyarrow")
+    df = tbl.to_pandas(
+        split_blocks=True,
+        self_destruct=True,
+        use_threads=True,
+        date_as_object=False,
+        types_mapper={pa.string(): arrow_str, pa.large_string(): arrow_str}.get,
+    )
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
     return df
 
 
+def fetch_backlog_df(columns=None):
+    """Pulls the raw dataframe from Snowflake using your SQL (see fetch_backlog_table)."""
+    return _table_to_df(fetch_backlog_table(columns))
+
+
+CACHE_DIR = ".cache"
+
+
+def fetch_backlog_df_cached(ttl_minutes: int = 60, force_refresh: bool = False, columns=None):
+    """fetch_backlog_df(), but reuses a local Parquet copy of the result for `ttl_minutes`.
+
+    The cache file is keyed on a hash of BURNDOWN_SQL + its binds, so editing
+    the query invalidates it. force_refresh=True always goes back to Snowflake.
+    The Arrow table is cached as-is (no pandas round-trip), so a cache hit goes
+    through the same _table_to_df() conversion as a fresh pull.
+    """
+    key = hashlib.sha1(
+        (BURNDOWN_TEMP_SQL + BURNDOWN_SQL + repr(BURNDOWN_PARAMS) + repr(columns)).encode()
+    ).hexdigest()
+    path = os.path.join(CACHE_DIR, f"{key}.parquet")
+
+    if not force_refresh and os.path.exists(path):
+        age_minutes = (time.time() - os.path.getmtime(path)) / 60
+        if age_minutes < ttl_minutes:
+            print(f"✅ Using cached Snowflake extract ({age_minutes:.0f} min old).")
+            return _table_to_df(pq.read_table(path))
+
+    tbl = fetch_backlog_table(columns)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    pq.write_table(tbl, path, compression="zstd", use_dictionary=True)
+    return _table_to_df(tbl)
+
+
 # ------------------------------------------------------------------
 # 2. BUILD ALLWOs / ALLTWWOs / SHIFT MAP FROM DATAFRAME
 # ------------------------------------------------------------------
 
-def build_backlog_views(df: pd.DataFrame):
-    """From raw df, build allWOs/allTWWOs/NANC and tw_shift_map and totals."""
-
-    # Query for totals
-    dtquery = '`Delivery Team` in ["CD - Wedge","CD - Product SDK"]'
-    statusquery = '`Project Status` not in ["Cancelled", "Completed", "Customer Requested Cancellation", "In Question"]'
-    subtypequery = '`Project Sub-Type` == "PROSERV"'
-
-    allWOs = (
-        df
-        .query(f"{dtquery} and {statusquery} and {subtypequery}")
-        .reset_index(drop=True)
-    )
-    allWOs = allWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
-
-    # Tailwind-only (CD - Wedge)
-    dtTWquery = '`Delivery Team` in ["CD - Wedge"]'
-    allTWWOs = (
-        df
-        .query(f"{dtTWquery} and {statusquery} and {subtypequery}")
-        .reset_index(drop=True)
+def _scope_filter_table(tbl: pa.Table) -> pa.Table:
+    """In-scope rows of an Arrow table, same predicate as the pandas masks below."""
+    mask = pc.and_(
+        pc.and_(
+            pc.is_in(tbl["Delivery Team"], value_set=pa.array(BURNDOWN_PARAMS["delivery_teams"])),
+            pc.invert(pc.is_in(tbl["Project Status"], value_set=pa.array(BURNDOWN_PARAMS["closed_statuses"]))),
+        ),
+        pc.equal(tbl["Project Sub-Type"], BURNDOWN_PARAMS["project_sub_type"]),
     )
-    allTWWOs = allTWWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
-
-    # Non-Actionable Non-Certified (optional)
-    NANC_dtquery = '`Delivery Team` in ["CD - Product SDK"]'
-    NANC_statusquery = '`Project Status` in ["Pending GA"]'
-    allNANCWOs = (
-        df
-        .query(f"{NANC_dtquery} and {NANC_statusquery} and {subtypequery}")
-        .reset_index(drop=True)
+    return tbl.filter(mask)  # null mask entries drop, like NaN comparisons in pandas
+
+
+def _cat_isin(s: pd.Series, values) -> np.ndarray:
+    """Membership test on a categorical's integer codes; missing values never match."""
+    idx = s.cat.categories.get_indexer(list(values))
+    return np.isin(s.cat.codes.to_numpy(), idx[idx >= 0])
+
+
+def _month_offset(dates: pd.Series, today: pd.Timestamp) -> pd.arrays.IntegerArray:
+    """Calendar months from `today` to each date via datetime64[M]; <NA> where the date is missing."""
+    months = dates.to_numpy(dtype="datetime64[M]")
+    offset = (months - np.datetime64(today, "M")).astype(np.int64)
+    return pd.arrays.IntegerArray(offset, np.isnat(months))
+
+
+class BacklogViews(NamedTuple):
+    """What the apps read from build_backlog_views(); no row-level frames are kept."""
+    rows_in_scope: int
+    total_backlog: float
+    total_TW_backlog: float
+    total_NANC_backlog: float
+    total_AC_backlog: float
+    tw_shift_map: dict
+    shift_arr: np.ndarray
+    shift_schedule: pd.DataFrame
+    nanc_export: pd.DataFrame
+    allwo_export: pd.DataFrame
+
+
+def build_backlog_views(df) -> BacklogViews:
+    """From raw df, build the bucket totals, shift schedule and WO exports.
+
+    `df` may also be a pyarrow Table (fetch_backlog_table()); it is filtered to
+    in-scope rows in Arrow before anything is converted to pandas.
+    """
+    if isinstance(df, pa.Table):
+        df = _table_to_df(_scope_filter_table(df))
+
+    # Scope masks (same filters as BURNDOWN_SQL's WHERE; no-ops on a Snowflake pull).
+    # astype("category") is free for a fetched df and makes uploaded extracts match.
+    team = df["Delivery Team"].astype("category")
+    status = df["Project Status"].astype("category")
+    sub_mask = _cat_isin(df["Project Sub-Type"].astype("category"), [BURNDOWN_PARAMS["project_sub_type"]])
+    open_mask = ~_cat_isin(status, BURNDOWN_PARAMS["closed_statuses"])
+
+    scope_mask = _cat_isin(team, BURNDOWN_PARAMS["delivery_teams"]) & open_mask & sub_mask
+    tw_mask = _cat_isin(team, ["CD - Wedge"]) & open_mask & sub_mask
+    nanc_mask = _cat_isin(team, ["CD - Product SDK"]) & _cat_isin(status, ["Pending GA"]) & sub_mask
+
+    # One category code per row: 0 Tailwind / 1 Non-Actionable / 2 Actionable,
+    # -1 out of scope (TW and NANC rows are subsets of scope). Every view and
+    # bucket total below is a slice or reduction over these codes.
+    codes = np.select(
+        [tw_mask, nanc_mask, scope_mask],
+        [0, 1, 2],
+        default=-1,
+    ).astype(np.int8)
+    in_scope = codes >= 0
+
+    allWOs = df[in_scope].rename(columns=RENAME_MAP).reset_index(drop=True)
+    allWOs["Work_Category"] = pd.Categorical.from_codes(codes[in_scope], categories=WORK_CATEGORIES)
+
+    # Bucket totals in one pass over the in-scope codes
+    backlog = (
+        df["Allocated Hours (User×CWO)"].to_numpy(dtype=float, na_value=0.0)
+        - df["Hours Logged (User×CWO)"].to_numpy(dtype=float, na_value=0.0)
     )
-    allNANCWOs = allNANCWOs.rename(columns={
-        "Allocated Hours (User×CWO)": "Allocated_Hours",
-        "Hours Logged (User×CWO)": "Hours_Logged"
-    }).reset_index()
+    TW_sum, NANC_sum, AC_sum = np.bincount(codes[in_scope], weights=backlog[in_scope], minlength=3)
 
-    # Total backlog
-    allocated_sum = allWOs["Allocated_Hours"].sum()
-    logged_sum = allWOs["Hours_Logged"].sum()
-    total_backlog = float(allocated_sum - logged_sum)
-
-    TW_allocated_sum = allTWWOs["Allocated_Hours"].sum()
-    TW_logged_sum = allTWWOs["Hours_Logged"].sum()
-    total_TW_backlog = float(TW_allocated_sum - TW_logged_sum)
+    total_TW_backlog = float(TW_sum)
+    total_NANC_backlog = float(NANC_sum)
+    total_AC_backlog = float(AC_sum)
+    total_backlog = total_TW_backlog + total_NANC_backlog + total_AC_backlog
 
     
     # Build shift map (Non-Actionable Non-Certified -> Tailwind) based on Contingent Go-Live
     #
     # Important: Items with Contingent Go-Live within the next ~30 days should shift in Month 1
     # (Month 0 is the "current state" row with no flows applied).
-    wo_backlog = (
-    allNANCWOs
-    .groupby("Work Order Code", as_index=False)
-    .agg({
-        "Allocated_Hours": "sum",
-        "Hours_Logged": "sum",
-        "Delivery Team": "first",
-        "Account Name": "first",
-        "Project Status": "first",
-        "Work Order Description": "first",
-        "Contingent Work Order": "first",
-        "Contingent Go-Live Date": "first",
-    })
+    #
+    # One groupby over every in-scope row produces both the NANC work orders
+    # (wo_backlog) and the all-work-orders export (allwo_backlog). Work_Category
+    # is part of the key so the NANC slice sums exactly the Non-Actionable rows.
+    wo_agg = (
+        allWOs
+        .groupby(["Work Order Code", "Work_Category"], as_index=False, observed=True)
+        .agg({
+            "Allocated_Hours": "sum",
+            "Hours_Logged": "sum",
+            "Delivery Team": "first",
+            "Account Name": "first",
+            "Project Status": "first",
+            "Work Order Description": "first",
+            "Slotted Go-Live Date": "first",
+            "Contingent Work Order": "first",
+            "Contingent Go-Live Date": "first",
+        })
     )
 
-    wo_backlog["Backlog"] = wo_backlog["Allocated_Hours"] - wo_backlog["Hours_Logged"]
+    wo_agg["Backlog"] = np.subtract(
+        wo_agg["Allocated_Hours"].to_numpy(), wo_agg["Hours_Logged"].to_numpy()
+    )
 
-    # Ensure datetime
-    wo_backlog["Contingent Go-Live Date"] = pd.to_datetime(
-        wo_backlog["Contingent Go-Live Date"], errors="coerce"
+    # Already datetime64 for Snowflake pulls (see _table_to_df); this only
+    # parses uploaded extracts, and runs once on the per-WO frame
+    wo_agg["Contingent Go-Live Date"] = pd.to_datetime(
+        wo_agg["Contingent Go-Live Date"], errors="coerce"
     )
 
     today = pd.Timestamp.today().normalize()
 
+    # Months-to-go-live for every WO (nullable); both exports use it
+    wo_agg["Months_To_GoLive"] = _month_offset(wo_agg["Contingent Go-Live Date"], today)
+
+    wo_backlog = wo_agg[wo_agg["Work_Category"].eq("Non-Actionable")].reset_index(drop=True)
+    allwo_backlog = wo_agg
+
     eligible = wo_backlog[
         wo_backlog["Contingent Work Order"].notna()
         & wo_backlog["Contingent Go-Live Date"].notna()
@@ -436,29 +637,14 @@ def build_backlog_views(df: pd.DataFrame):
     # -------------------------------
     # Calendar-month bucketing (year-safe)
     # -------------------------------
-    today_m = today.to_period("M")
-    golive_m = eligible["Contingent Go-Live Date"].dt.to_period("M")
-
     # Calendar month difference: 0 = same calendar month, 1 = next month, etc.
-    eligible["GoLive_Month_Offset"] = (
-            golive_m.astype("int64") - today_m.ordinal
-    ).astype("Int64")  # nullable integer (keeps <NA> if Go-Live is missing)
+    eligible["GoLive_Month_Offset"] = _month_offset(eligible["Contingent Go-Live Date"], today)
 
     # ---------------------------------------------------------
     # NANC export table (one row per Work Order Code)
     # ---------------------------------------------------------
-    nanc_export = wo_backlog.copy()
-
-    # Compute months-to-go-live for all NANC WOs (nullable)
-    nanc_export["Months_To_GoLive"] = (
-        nanc_export["Contingent Go-Live Date"]
-        .dt.to_period("M")
-        .astype("int64")
-        .sub(today.to_period("M").ordinal)
-    ).astype("Int64")
-
     # Final column order
-    nanc_export = nanc_export[[
+    nanc_export = wo_backlog[[
         "Work Order Code",
         "Account Name",
         "Project Status",
@@ -473,51 +659,6 @@ def build_backlog_views(df: pd.DataFrame):
     # ALL work orders export table (one row per Work Order Code)
     # Includes Work_Category: Tailwind / Non-Actionable / Actionable
     # ---------------------------------------------------------
-    allwo_backlog = (
-        allWOs
-        .groupby("Work Order Code", as_index=False)
-        .agg({
-            "Allocated_Hours": "sum",
-            "Hours_Logged": "sum",
-            "Delivery Team": "first",
-            "Account Name": "first",
-            "Project Status": "first",
-            "Work Order Description": "first",
-            "Slotted Go-Live Date": "first",
-            "Contingent Work Order": "first",
-            "Contingent Go-Live Date": "first",
-        })
-    )
-
-    allwo_backlog["Backlog"] = allwo_backlog["Allocated_Hours"] - allwo_backlog["Hours_Logged"]
-
-    # Ensure datetime for month math
-    allwo_backlog["Contingent Go-Live Date"] = pd.to_datetime(
-        allwo_backlog["Contingent Go-Live Date"], errors="coerce"
-    )
-
-    # Tailwind: CD - Wedge (matches allTWWOs filter) :contentReference[oaicite:4]{index=4}
-    # Non-Actionable: CD - Product SDK + Pending GA (matches allNANCWOs filter) :contentReference[oaicite:5]{index=5}
-    # Actionable: everything else in allWOs :contentReference[oaicite:6]{index=6}
-    allwo_backlog["Work_Category"] = np.select(
-        [
-            allwo_backlog["Delivery Team"].eq("CD - Wedge"),
-            allwo_backlog["Delivery Team"].eq("CD - Product SDK") & allwo_backlog["Project Status"].eq("Pending GA"),
-        ],
-        [
-            "Tailwind",
-            "Non-Actionable",
-        ],
-        default="Actionable",
-    )
-
-    allwo_backlog["Months_To_GoLive"] = (
-        allwo_backlog["Contingent Go-Live Date"]
-        .dt.to_period("M")
-        .astype("int64")
-        .sub(today.to_period("M").ordinal)
-    ).astype("Int64")
-
     allwo_export = allwo_backlog[[
         "Work Order Code",
         "Account Name",
@@ -558,199 +699,243 @@ def build_backlog_views(df: pd.DataFrame):
     if 0 in tw_shift_map:
         tw_shift_map[1] = float(tw_shift_map.get(1, 0.0)) + float(tw_shift_map.pop(0))
 
-    return {
-        "df": df,
-        "allWOs": allWOs,
-        "allTWWOs": allTWWOs,
-        "allNANCWOs": allNANCWOs,
-        "total_backlog": total_backlog,
-        "total_TW_backlog": total_TW_backlog,
-        "tw_shift_map": tw_shift_map,
-        "shift_schedule": shift_schedule,
-        "eligible": eligible,
-        "nanc_export": nanc_export,
-        "allwo_export": allwo_export,
-    }
+    # Same schedule as a dense array indexed by month (what run_tailwind_model reads)
+    shift_arr = np.bincount(
+        eligible["Shift_Month"].to_numpy(dtype=np.int64),
+        weights=eligible["Backlog"].to_numpy(dtype=np.float64),
+        minlength=2,
+    )
+
+    return BacklogViews(
+        rows_in_scope=len(allWOs),
+        total_backlog=total_backlog,
+        total_TW_backlog=total_TW_backlog,
+        total_NANC_backlog=total_NANC_backlog,
+        total_AC_backlog=total_AC_backlog,
+        tw_shift_map=tw_shift_map,
+        shift_arr=shift_arr,
+        shift_schedule=shift_schedule,
+        nanc_export=nanc_export,
+        allwo_export=allwo_export,
+    )
 
 
 # ------------------------------------------------------------------
 # 3. BURNDOWN MODEL
 # ------------------------------------------------------------------
 
-def run_tailwind_model(
-    total_backlog: float,
-    total_TW_backlog: float,
-    total_NANC_backlog: float,
-    tw_headcount: int,
-    q2_headcount: int,
-    utilization: float,
-    qtr_demand_total: float,
-    q2_capacity_to_q2_pct: float,
-    tw_share_of_demand: float,      # fraction 0–1
-    months: int,
-    tw_shift_map: dict,
-    removal_threshold_months: float,  # threshold in months at full capacity
-    tw_capacity_reduction_month: int = 0,  # 1-based month; 0 disables reduction
-    model_diff_demand_after_removal: bool = False,
-    post_removal_qtr_demand_total: float | None = None,
-    modify_demand_after_12_months: bool = False,
-    post_12_qtr_demand_total: float | None = None,
-) -> pd.DataFrame:
-
-    # -----------------------------
-    # Initialize backlog buckets
-    # -----------------------------
-    TW_b = float(total_TW_backlog)
-    NANC_b = float(total_NANC_backlog)
-    AC_b = float(total_backlog - total_TW_backlog - total_NANC_backlog)
-    if AC_b < 0:
-        AC_b = 0.0
-
-    # -----------------------------
-    # Capacities (monthly)
-    # -----------------------------
-    TW_capacity = tw_headcount * (2080 / 12) * utilization
-    Q2_capacity_full = q2_headcount * (2080 / 12) * utilization  # full Q2 monthly capacity
-
+def _shift_array(tw_shift_map, months: int) -> np.ndarray:
+    """Dense NANC -> Tailwind shift hours by month; month 0 shifts fold into month 1.
+
+    Accepts either the {month: hours} map or the dense `shift_arr` view.
+    """
+    shift_arr = np.zeros(months + 2, dtype=np.float64)
+    if isinstance(tw_shift_map, np.ndarray):
+        n = min(tw_shift_map.size, months + 1)
+        shift_arr[:n] = tw_shift_map[:n]
+    else:
+        for m, v in tw_shift_map.items():
+            if 0 <= m <= months:
+                shift_arr[int(m)] += float(v)
+    shift_arr[1] += shift_arr[0]
+    shift_arr[0] = 0.0
+    return shift_arr
+
+
+@njit(cache=True, nogil=True)
+def _run_loop_nb(
+    TW_b,
+    NANC_b,
+    AC_b,
+    TW_capacity,
+    Q2_capacity_full,
+    months,
+    qtr_demand_total,
+    q2_pct,
+    tw_share,
+    shift_arr,
+    removal_threshold_months,
+    tw_capacity_reduction_month,
+    model_diff_demand_after_removal,
+    post_removal_qtr_demand_total,
+    modify_demand_after_12_months,
+    post_12_qtr_demand_total,
+):
+    """Month loop of run_tailwind_model; None inputs resolved by the caller.
+
+    Returns a (months + 1, 7) array with columns Total, TW, NANC, AC backlog,
+    capacity, backlog months (NaN when capacity is 0) and Tailwind-active (1.0 / 0.0).
+    """
+    out = np.empty((months + 1, 7), dtype=np.float64)
     tailwind_active = True
-    results_reduced: list[dict] = []
 
-    # -------------------------------------------------
     # Month 0: baseline row (no burn, no incoming, no shifts)
-    # -------------------------------------------------
-    total_cap_m0 = TW_capacity + Q2_capacity_full
-    total_b0 = TW_b + NANC_b + AC_b
-    results_reduced.append({
-        "Month": 0,
-        "Total_Backlog": total_b0,
-        "TW_Backlog": TW_b,
-        "NANC_Backlog": NANC_b,
-        "AC_Backlog": AC_b,
-        "Total_Capacity": total_cap_m0,
-        "Backlog_Months": (total_b0 / total_cap_m0) if total_cap_m0 > 0 else None,
-        "Tailwind_Active": tailwind_active
-    })
+    total_cap = TW_capacity + Q2_capacity_full
+    total_b = TW_b + NANC_b + AC_b
+    out[0, 0] = total_b
+    out[0, 1] = TW_b
+    out[0, 2] = NANC_b
+    out[0, 3] = AC_b
+    out[0, 4] = total_cap
+    out[0, 5] = total_b / total_cap if total_cap > 0 else np.nan
+    out[0, 6] = 1.0
 
-    # Ensure shifts occur starting Month 1 (model loop is 1..N)
-    if 0 in tw_shift_map:
-        tw_shift_map[1] = float(tw_shift_map.get(1, 0.0)) + float(tw_shift_map.pop(0))
-
-    # -------------------------------------------------
-    # Months 1..N: apply incoming, burn, shifts
-    # -------------------------------------------------
     for month in range(1, months + 1):
-
-        # Determine quarterly demand while Tailwind is active
         active_qtr_demand = qtr_demand_total
         if tailwind_active and modify_demand_after_12_months and month >= 13:
-            active_qtr_demand = post_12_qtr_demand_total if post_12_qtr_demand_total is not None else qtr_demand_total
+            active_qtr_demand = post_12_qtr_demand_total
 
         # Capacities and incoming
+        Q2_cap_current = Q2_capacity_full
         if tailwind_active:
             TW_cap_current = TW_capacity
-            if tw_capacity_reduction_month and month >= tw_capacity_reduction_month:
+            if tw_capacity_reduction_month > 0 and month >= tw_capacity_reduction_month:
                 TW_cap_current *= 0.5
-
-            # Q2 is available; split between AC vs TW per allocation slider
-            Q2_cap_current = Q2_capacity_full
-
-            TW_incoming_current = active_qtr_demand * tw_share_of_demand * (1 / 3)
-            AC_incoming_current = active_qtr_demand * (1 - tw_share_of_demand) * (1 / 3)
+            TW_incoming = active_qtr_demand * tw_share * (1 / 3)
+            AC_incoming = active_qtr_demand * (1 - tw_share) * (1 / 3)
+            Q2_cap_to_AC = Q2_cap_current * q2_pct
+            Q2_cap_to_TW = Q2_cap_current * (1.0 - q2_pct)
         else:
-            # Tailwind removed: TW capacity/incoming = 0, Q2 continues
             TW_cap_current = 0.0
-            TW_incoming_current = 0.0
-
-            Q2_cap_current = Q2_capacity_full
-
-            if model_diff_demand_after_removal:
-                effective_qtr = post_removal_qtr_demand_total if post_removal_qtr_demand_total is not None else qtr_demand_total
-                AC_incoming_current = effective_qtr * (1 / 3)
-            else:
-                AC_incoming_current = 0.0
-
-        # -----------------------------
-        # Burn logic
-        # -----------------------------
-        if tailwind_active:
-            # Q2 allocation: some capacity burns AC, remainder supports TW
-            Q2_cap_to_AC = Q2_cap_current * float(q2_capacity_to_q2_pct)
-            Q2_cap_to_TW = Q2_cap_current * (1.0 - float(q2_capacity_to_q2_pct))
-        else:
-            # After Tailwind removal, all Q2 capacity burns AC
+            TW_incoming = 0.0
+            AC_incoming = post_removal_qtr_demand_total * (1 / 3) if model_diff_demand_after_removal else 0.0
             Q2_cap_to_AC = Q2_cap_current
             Q2_cap_to_TW = 0.0
 
-        # NANC is NOT burned; it only shifts.
-
-        # 1) Burn Actionable with its allocated Q2 capacity
+        # Burn AC first; unused AC capacity rolls over to Tailwind the same month
         AC_burn = min(AC_b, Q2_cap_to_AC)
         AC_b_after_burn = AC_b - AC_burn
-
-        # 2) If Actionable is exhausted, reallocate the unused AC capacity to Tailwind (same month)
-        unused_AC_capacity = max(Q2_cap_to_AC - AC_burn, 0.0)
-        effective_Q2_cap_to_TW = Q2_cap_to_TW + unused_AC_capacity
-
-        # 3) Burn Tailwind with TW capacity + all Q2 capacity available to TW (including reallocated)
+        effective_Q2_cap_to_TW = Q2_cap_to_TW + max(Q2_cap_to_AC - AC_burn, 0.0)
         TW_burn = min(TW_b, TW_cap_current + effective_Q2_cap_to_TW)
 
-        # 4) Apply burn + incoming
-        TW_b = max(TW_b - TW_burn + TW_incoming_current, 0.0)
-        AC_b = max(AC_b_after_burn + AC_incoming_current, 0.0)
+        TW_b = max(TW_b - TW_burn + TW_incoming, 0.0)
+        AC_b = max(AC_b_after_burn + AC_incoming, 0.0)
 
-        # -----------------------------
-        # Apply NANC -> Tailwind shift (Month 1+ only)
-        # -----------------------------
+        # NANC -> Tailwind shift
         if tailwind_active:
-            shift = float(tw_shift_map.get(month, 0.0))
+            shift = shift_arr[month]
             if shift > 0:
                 actual_shift = min(NANC_b, shift)
                 NANC_b -= actual_shift
                 TW_b += actual_shift
 
-        # -----------------------------
         # Metrics & Tailwind removal check
-        # -----------------------------
         total_b = TW_b + NANC_b + AC_b
-        total_cap_current = TW_cap_current + Q2_cap_current
-        backlog_months = (total_b / total_cap_current) if total_cap_current > 0 else None
+        total_cap = TW_cap_current + Q2_cap_current
+        backlog_months = total_b / total_cap if total_cap > 0 else np.nan
 
-        if tailwind_active and (backlog_months is not None) and (backlog_months <= removal_threshold_months):
+        if tailwind_active and total_cap > 0 and backlog_months <= removal_threshold_months:
             tailwind_active = False
 
-            # If modeling different incoming demand after removal, apply starting in threshold month
             if model_diff_demand_after_removal:
-                effective_qtr = post_removal_qtr_demand_total if post_removal_qtr_demand_total is not None else qtr_demand_total
-                effective_monthly = effective_qtr * (1 / 3)
-
-                # Remove TW incoming already applied this month (post-removal TW incoming = 0)
-                TW_b = max(TW_b - TW_incoming_current, 0.0)
-
-                # Replace AC incoming for this month with post-removal incoming (if different)
-                AC_b = max(AC_b + (effective_monthly - AC_incoming_current), 0.0)
+                effective_monthly = post_removal_qtr_demand_total * (1 / 3)
+                TW_b = max(TW_b - TW_incoming, 0.0)
+                AC_b = max(AC_b + (effective_monthly - AC_incoming), 0.0)
 
-            # Transfer any remaining TW backlog into AC (so Q2 can burn it going forward)
             AC_b += TW_b
             TW_b = 0.0
 
-            # Recompute metrics with Q2-only capacity
-            total_b = TW_b + NANC_b + AC_b
-            total_cap_current = Q2_capacity_full
-            backlog_months = (total_b / total_cap_current) if total_cap_current > 0 else None
-
-        results_reduced.append({
-            "Month": month,
-            "Total_Backlog": total_b,
-            "TW_Backlog": TW_b,
-            "NANC_Backlog": NANC_b,
-            "AC_Backlog": AC_b,
-            "Total_Capacity": total_cap_current,
-            "Backlog_Months": backlog_months,
-            "Tailwind_Active": tailwind_active
-        })
+            total_b = NANC_b + AC_b
+            total_cap = Q2_capacity_full
+            backlog_months = total_b / total_cap if total_cap > 0 else np.nan
+
+        out[month, 0] = total_b
+        out[month, 1] = TW_b
+        out[month, 2] = NANC_b
+        out[month, 3] = AC_b
+        out[month, 4] = total_cap
+        out[month, 5] = backlog_months
+        out[month, 6] = 1.0 if tailwind_active else 0.0
+
+    return out
 
-    return pd.DataFrame(results_reduced)
 
+def run_tailwind_model(
+    total_backlog: float,
+    total_TW_backlog: float,
+    total_NANC_backlog: float,
+    tw_headcount: int,
+    q2_headcount: int,
+    utilization: float,
+    qtr_demand_total: float,
+    q2_capacity_to_q2_pct: float,
+    tw_share_of_demand: float,      # fraction 0–1
+    months: int,
+    tw_shift_map: dict | np.ndarray,  # {month: hours} or dense views["shift_arr"]
+    removal_threshold_months: float,  # threshold in months at full capacity
+    tw_capacity_reduction_month: int = 0,  # 1-based month; 0 disables reduction
+    model_diff_demand_after_removal: bool = False,
+    post_removal_qtr_demand_total: float | None = None,
+    modify_demand_after_12_months: bool = False,
+    post_12_qtr_demand_total: float | None = None,
+) -> pd.DataFrame:
+
+    # -----------------------------
+    # Initialize backlog buckets
+    # -----------------------------
+    TW_b = float(total_TW_backlog)
+    NANC_b = float(total_NANC_backlog)
+    AC_b = max(float(total_backlog - total_TW_backlog - total_NANC_backlog), 0.0)
+
+    # -----------------------------
+    # Capacities (monthly)
+    # -----------------------------
+    TW_capacity = tw_headcount * (2080 / 12) * utilization
+    Q2_capacity_full = q2_headcount * (2080 / 12) * utilization  # full Q2 monthly capacity
+
+    months = int(months)
+    if post_removal_qtr_demand_total is None:
+        post_removal_qtr_demand_total = qtr_demand_total
+    if post_12_qtr_demand_total is None:
+        post_12_qtr_demand_total = qtr_demand_total
+
+    out = _run_loop_nb(
+        TW_b,
+        NANC_b,
+        AC_b,
+        float(TW_capacity),
+        float(Q2_capacity_full),
+        months,
+        float(qtr_demand_total),
+        float(q2_capacity_to_q2_pct),
+        float(tw_share_of_demand),
+        _shift_array(tw_shift_map, months),
+        float(removal_threshold_months),
+        int(tw_capacity_reduction_month or 0),
+        bool(model_diff_demand_after_removal),
+        float(post_removal_qtr_demand_total),
+        bool(modify_demand_after_12_months),
+        float(post_12_qtr_demand_total),
+    )
+
+    return pd.DataFrame({
+        "Month": np.arange(months + 1),
+        "Total_Backlog": out[:, 0],
+        "TW_Backlog": out[:, 1],
+        "NANC_Backlog": out[:, 2],
+        "AC_Backlog": out[:, 3],
+        "Total_Capacity": out[:, 4],
+        "Backlog_Months": out[:, 5],
+        "Tailwind_Active": out[:, 6].astype(bool),
+    })
+
+
+# ------------------------------------------------------------------
+# 4. EXPORTS
+# ------------------------------------------------------------------
 
-    df_reduced = pd.DataFrame(results_reduced)
-    return df_reduced
+def to_excel_fast(df: pd.DataFrame, path_or_buf, sheet_name: str = "Sheet1"):
+    """Data-only .xlsx via a write-only openpyxl workbook (no per-cell styling).
+
+    `path_or_buf` is a file path or a writable binary buffer (e.g. BytesIO).
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    ws.append([str(c) for c in df.columns])
+    # NaN/NaT/<NA> -> empty cells
+    values = df.astype(object).where(df.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(path_or_buf)